@@ -0,0 +1,61 @@
+"""Conditional GET helpers (ETag / Last-Modified / 304).
+
+Routes compute a version for the resource with a cheap aggregate query
+(`updated_at`, or max(updated_at) plus the row count for lists), then call
+`check_conditional` before loading and serializing the full body.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given version parts."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # timestamps from the DB are timezone-aware; treat naive ones as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses weak comparison
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def check_conditional(
+    request: Request, response: Response, etag: str, last_modified: datetime | None
+) -> Response | None:
+    """Set validators on `response`; return a 304 response if the client is current.
+
+    If-None-Match wins over If-Modified-Since, as RFC 9110 requires.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        # HTTP dates have whole-second precision
+        if _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -0,0 +1,42 @@
+"""Which database a read-only request is served from.
+
+GET endpoints depend on `get_read_db`, which hands them a replica session
+unless the client asked for primary reads (`X-Read-Consistency: primary`)
+or wrote recently: a successful write sets `PRIMARY_READS_COOKIE` (see the
+read-your-writes middleware in app/main.py) holding the time until which
+its reads stay on the primary.
+"""
+import time
+from fastapi import Depends, Request
+from app.config import env_float
+from app.database import read_session_factory
+
+# After a write, the client reads from the primary for this many seconds so
+# it never observes replica lag on its own changes.
+READ_YOUR_WRITES_SECONDS = env_float("READ_YOUR_WRITES_SECONDS", 5.0)
+PRIMARY_READS_COOKIE = "db_primary_until"
+READ_CONSISTENCY_HEADER = "x-read-consistency"
+
+
+def wants_primary_reads(request: Request) -> bool:
+    """True when the client asked for, or recently earned, primary reads."""
+    if request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary":
+        return True
+    pinned_until = request.cookies.get(PRIMARY_READS_COOKIE)
+    if pinned_until:
+        try:
+            return float(pinned_until) > time.time()
+        except ValueError:
+            return False
+    return False
+
+
+def primary_reads_cookie_value() -> str:
+    """Cookie value pinning reads to the primary for `READ_YOUR_WRITES_SECONDS` from now."""
+    return f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+
+
+# Dependency for read-only endpoints
+async def get_read_db(primary: bool = Depends(wants_primary_reads)):
+    async with read_session_factory(primary)() as session:
+        yield session
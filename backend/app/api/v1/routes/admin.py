@@ -0,0 +1,173 @@
+import asyncio
+import os
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from app import memory_tracing, profiling
+from app.cache import cache
+from app.invalidation import bus
+from app.service.jwt_keys import key_ring
+from app.service.otp_sweeper import otp_sweeper, sweeper_applies
+from app.service.token_revocation import revocation_index
+from app.singleflight import singleflight_stats
+from app.database import engine, get_pool_stats, replica_engines
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+
+async def require_admin(x_admin_token: str = Header(default="")):
+    """Guard for operational endpoints.
+
+    The admin API is disabled unless `ADMIN_API_TOKEN` is set; callers must
+    send the same value in the `X-Admin-Token` header.
+    """
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/db/pool", response_model=dict)
+async def db_pool_stats():
+    """Live connection pool usage for this worker."""
+    return {
+        "primary": get_pool_stats(engine),
+        "replicas": [get_pool_stats(replica) for replica in replica_engines],
+    }
+
+
+@router.get("/cache", response_model=dict)
+async def cache_stats():
+    """Repository cache hit/miss counters for this worker."""
+    return {**cache.stats(), "invalidation_bus": bus.stats()}
+
+
+@router.get("/singleflight", response_model=dict)
+async def singleflight_counters():
+    """How many concurrent identical reads were collapsed, per call site."""
+    return singleflight_stats()
+
+
+@router.get("/auth/revocation", response_model=dict)
+async def token_revocation_stats():
+    """Revocation filter size and how many checks it answered without a query."""
+    return revocation_index.stats()
+
+
+@router.get("/otp/sweeper", response_model=dict)
+async def otp_sweeper_stats():
+    """Rows expired and partitions created/dropped by the OTP sweeper in this worker."""
+    return otp_sweeper.stats.as_dict()
+
+
+@router.post("/otp/sweeper/run", response_model=dict)
+async def run_otp_sweeper():
+    """Run one sweep now (still subject to the cross-worker lock)."""
+    if not sweeper_applies():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="OTP sweeper does not apply (disabled, non-SQL OTP store or not Postgres)",
+        )
+    return await otp_sweeper.run_once()
+
+
+@router.get("/profiles", response_model=dict)
+async def list_profiles():
+    """Stored request profiles (speedscope JSON), newest first."""
+    return {
+        "enabled": profiling.PROFILING_ENABLED,
+        "keep": profiling.PROFILE_KEEP,
+        "profiles": profiling.list_profiles(),
+    }
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """One stored profile; open it at https://www.speedscope.app."""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@router.post("/profiles/token", response_model=dict)
+async def profile_token(ttl_seconds: int = Query(300, ge=1, le=profiling.PROFILE_TOKEN_MAX_TTL_SECONDS)):
+    """Value of the `X-Profile` header that gets a request profiled until it expires."""
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profiling is disabled")
+    try:
+        token, expires = profiling.profile_token(ttl_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {"header": "X-Profile", "value": token, "expires": expires}
+
+
+@router.get("/memory", response_model=dict)
+async def memory_status():
+    """Whether tracemalloc is tracing in this worker, traced bytes and stored snapshots."""
+    return memory_tracing.status()
+
+
+@router.post("/memory/start", response_model=dict)
+async def start_memory_tracing(frames: int = Query(memory_tracing.MEMORY_TRACE_FRAMES, ge=1, le=50)):
+    """Start tracing allocations in this worker (slows it down until stopped)."""
+    return memory_tracing.start(frames)
+
+
+@router.post("/memory/stop", response_model=dict)
+async def stop_memory_tracing():
+    """Stop tracing and drop the stored snapshots."""
+    return memory_tracing.stop()
+
+
+@router.post("/memory/snapshots", response_model=dict)
+async def take_memory_snapshot(limit: int = Query(20, ge=1, le=500), group_by: memory_tracing.GroupBy = "lineno"):
+    """Store a snapshot and return its id with its top allocation sites."""
+    # snapshots and statistics walk every traced block: keep that off the event loop
+    try:
+        snapshot_id = await asyncio.to_thread(memory_tracing.take_snapshot)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    top = await asyncio.to_thread(memory_tracing.top, snapshot_id, limit, group_by)
+    return {"id": snapshot_id, "top": top}
+
+
+@router.get("/memory/snapshots/{snapshot_id}", response_model=dict)
+async def memory_snapshot_top(
+    snapshot_id: int, limit: int = Query(20, ge=1, le=500), group_by: memory_tracing.GroupBy = "lineno"
+):
+    """Top allocation sites of a stored snapshot."""
+    try:
+        top = await asyncio.to_thread(memory_tracing.top, snapshot_id, limit, group_by)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return {"id": snapshot_id, "top": top}
+
+
+@router.get("/memory/diff", response_model=dict)
+async def memory_snapshot_diff(
+    base: int, current: int, limit: int = Query(20, ge=1, le=500), group_by: memory_tracing.GroupBy = "lineno"
+):
+    """Allocation sites that grew (or shrank) most between two stored snapshots."""
+    try:
+        changes = await asyncio.to_thread(memory_tracing.diff, base, current, limit, group_by)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return {"base": base, "current": current, "changes": changes}
+
+
+@router.get("/memory/gc", response_model=dict)
+async def memory_gc_report():
+    """GC generation counts and live instances per ORM model class."""
+    return await asyncio.to_thread(memory_tracing.gc_report)
+
+
+@router.get("/jwt/keys", response_model=dict)
+async def jwt_keys():
+    """JWT signing keys in `JWT_KEYS_DIR` and where each is in its rotation."""
+    if not key_ring.enabled:
+        return {"enabled": False, "keys": []}
+    return {"enabled": True, "keys": key_ring.describe()}
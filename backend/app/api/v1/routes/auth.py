@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.schema.auth import LoginRequest, RefreshRequest, TokenResponse
+from app.schema.auth import LoginRequest, RefreshRequest, TokenClaims, TokenResponse
 from app.schema.otp import OtpResponse, OtpVerifyRequest
-from app.service.auth import AuthService
+from app.service.auth import AuthService, get_current_user
 
 router = APIRouter()
 
@@ -33,3 +33,8 @@ async def refresh_token(refresh_request: RefreshRequest, db: AsyncSession = Depe
         return TokenResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+
+@router.get("/me", response_model=TokenClaims)
+async def me(current_user: TokenClaims = Depends(get_current_user)):
+    return current_user
@@ -1,8 +1,12 @@
 import logging
-from fastapi import APIRouter, Depends,HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends,HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.conditional import check_conditional, make_etag
+from app.api.v1.read_routing import get_read_db
 from app.database import get_db
 from app.schema.organization import OrganizationCreate, OrganizationResponse, OrganizationUpdate
+from app.schema.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, Page, decode_cursor
 from app.service.organization import OrganizationService
 
 logger = logging.getLogger(__name__)
@@ -12,15 +16,21 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("get_org_list_by_id/{org_id}",response_model=OrganizationResponse)
-async def list_organizations(db: AsyncSession = Depends(get_db), org_id: str = ""):
-    logger.info(f"Fetching organization with ID: {org_id}")
+async def list_organizations(request: Request, response: Response, db: AsyncSession = Depends(get_read_db), org_id: str = ""):
+    logger.debug("Fetching organization %s", org_id)
     try:
-        result = await OrganizationService(db).get_org(org_id)
-        logger.debug(f"Organization found: {result}")
-        return result
+        org = await OrganizationService(db).get_org(org_id)
     except ValueError as e:
-        logger.error(f"Organization not found: {org_id}, Error: {str(e)}")
+        logger.info("Organization not found: %s", org_id)
         raise HTTPException(404, str(e))
+    except TimeoutError as e:
+        raise HTTPException(504, str(e))
+    # validators come from the row being served, which may be the cached copy
+    version = org.updated_at or org.created_at
+    not_modified = check_conditional(request, response, make_etag("org", org_id, version), version)
+    if not_modified:
+        return not_modified
+    return org
     
 @router.post("create_org",response_model=OrganizationResponse)
 async def create_organization(org: OrganizationCreate, db: AsyncSession = Depends(get_db)):
@@ -29,31 +39,42 @@ async def create_organization(org: OrganizationCreate, db: AsyncSession = Depend
     except ValueError as e:
         raise HTTPException(400, str(e))
     
-@router.get("get_org_list",response_model=list[OrganizationResponse])
-async def get_organizations(db: AsyncSession = Depends(get_db)):
-    logger.info("Fetching all organizations")
-    orgs = await OrganizationService(db).get_all_orgs()
-    logger.debug(f"Organizations found: {orgs}")
-    return [OrganizationResponse.model_validate(org) for org in orgs]
+@router.get("get_org_list",response_model=Page[OrganizationResponse])
+async def get_organizations(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    service = OrganizationService(db)
+    last_change, count = await service.get_orgs_version()
+    not_modified = check_conditional(request, response, make_etag("orgs", last_change, count, limit, cursor), last_change)
+    if not_modified:
+        return not_modified
+    page = await service.get_all_orgs(limit, after)
+    logger.debug("Organizations found: %d", len(page.items))
+    return page
 
 @router.delete("delete_org/{org_id}",response_model=dict)
 async def delete_organization(org_id: str, db: AsyncSession = Depends(get_db)):
-    logger.info(f"Deleting organization with ID: {org_id}")
+    logger.info("Deleting organization %s", org_id)
     try:
         await OrganizationService(db).delete_org(org_id)
-        logger.debug(f"Organization deleted: {org_id}")
         return {"detail": "Organization deleted"}
     except ValueError as e:
-        logger.error(f"Error deleting organization with ID: {org_id}, Error: {str(e)}")
+        logger.info("Organization not found for delete: %s (%s)", org_id, e)
         raise HTTPException(404, str(e))
     
 @router.put("update_org/{org_id}",response_model=OrganizationResponse)
 async def update_organization(org_id: str, org: OrganizationUpdate, db: AsyncSession = Depends(get_db)):
-    logger.info(f"Updating organization with ID: {org_id}")
+    logger.info("Updating organization %s", org_id)
     try:
-        updated_org = await OrganizationService(db).update_org(org_id, org)
-        logger.debug(f"Organization updated: {updated_org}")
-        return OrganizationResponse.model_validate(updated_org)
+        return await OrganizationService(db).update_org(org_id, org)
     except ValueError as e:
-        logger.error(f"Error updating organization with ID: {org_id}, Error: {str(e)}")
+        logger.info("Organization not found for update: %s (%s)", org_id, e)
         raise HTTPException(404, str(e))
\ No newline at end of file
@@ -1,20 +1,64 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.schema.users import UserCreate, UserResponse, UserUpdate
-from app.service.userService import UserService
+from app.api.v1.conditional import check_conditional, make_etag
+from app.api.v1.read_routing import get_read_db, wants_primary_reads
+from app.database import get_db, read_session_factory
+from app.query_stats import query_budget
+from app.schema.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, Page, decode_cursor
+from app.schema.users import UserBulkResult, UserBulkSelection, UserBulkUpdate, UserCreate, UserImportResult, UserResponse, UserUpdate
+from app.service.organization import OrganizationService
+from app.service.user_import import UserImporter, parse_rows
+from app.service.userService import EXPORT_CHUNK_SIZE, UserService
 
 router=APIRouter()
 
-@router.get("get_user_list/{org_id}",response_model=list[UserResponse])
-async def getAllUsers(db:AsyncSession  = Depends(get_db),org_id:str=""):
-   return await UserService(db).get_all_users(org_id)
+@router.get("get_user_list/{org_id}",response_model=Page[UserResponse])
+async def getAllUsers(request:Request, response:Response, db:AsyncSession  = Depends(get_read_db),org_id:str="",
+                      limit:int=Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT), cursor:Optional[str]=None):
+   try:
+     after = decode_cursor(cursor) if cursor else None
+   except ValueError as e:
+     raise HTTPException(400, str(e))
+   service = UserService(db)
+   last_change, count = await service.get_users_version(org_id)
+   not_modified = check_conditional(
+     request, response, make_etag("users", org_id, last_change, count, limit, cursor), last_change
+   )
+   if not_modified:
+     return not_modified
+   try:
+     return await service.get_all_users(org_id, limit, after)
+   except TimeoutError as e:
+     raise HTTPException(504, str(e))
   
 
 
+@router.get("export_users/{org_id}", response_class=StreamingResponse)
+@query_budget(None, None)  # one statement per chunk by design
+async def exportUsers(org_id:str="", primary:bool=Depends(wants_primary_reads), chunk_size:int=Query(EXPORT_CHUNK_SIZE, ge=1, le=10000)):
+  """Every active user of the organization as NDJSON, streamed from a server-side cursor."""
+  session_factory = read_session_factory(primary)
+
+  # owns its session: the body is produced after the endpoint has returned
+  async def ndjson():
+    async with session_factory() as db:
+      async for chunk in UserService(db).export_users(org_id, chunk_size):
+        yield chunk
+
+  return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @router.get("get_user_by_id/{user_id}/{org_id}",response_model=UserResponse)
-async def getUserById(db:AsyncSession  = Depends(get_db),user_id:str="",org_id:str=""):
-  return await  UserService(db).get_user_by_id(user_id,org_id)
+async def getUserById(request:Request, response:Response, db:AsyncSession  = Depends(get_read_db),user_id:str="",org_id:str=""):
+  user = await UserService(db).get_user_by_id(user_id,org_id)
+  # validators come from the row being served, which may be the cached copy
+  version = user.updated_at or user.created_at
+  not_modified = check_conditional(request, response, make_etag("user", user_id, org_id, version), version)
+  if not_modified:
+    return not_modified
+  return user
   
 
 @router.delete("delete_user/{user_id}/{org_id}")
@@ -26,7 +70,40 @@ async def deleteUserById(db:AsyncSession  = Depends(get_db),user_id:str="",org_i
 async def createUser(user_data:UserCreate, db:AsyncSession  = Depends(get_db)):
   return await UserService(db).create_user(user_data)
   
+@router.post("import_users/{org_id}",response_model=UserImportResult)
+@query_budget(None, None)  # one statement per chunk by design
+async def importUsers(request:Request, db:AsyncSession  = Depends(get_db),org_id:str=""):
+  """Bulk-create users from a streamed CSV (text/csv) or NDJSON (application/x-ndjson) body."""
+  try:
+    rows = parse_rows(request.stream(), request.headers.get("content-type", ""))
+  except ValueError as e:
+    raise HTTPException(415, str(e))
+  try:
+    org = await OrganizationService(db).get_org(org_id)
+  except ValueError as e:
+    raise HTTPException(404, str(e))
+  except TimeoutError as e:
+    raise HTTPException(504, str(e))
+  if not org.status:
+    raise HTTPException(404, "Organization not found")
+  return await UserImporter(db, org_id).run(rows)
+  
 @router.put("update_user/{user_id}/{org_id}",response_model=UserResponse)
 async def updateUser(user_data:UserUpdate, db:AsyncSession  = Depends(get_db),user_id:str="",org_id:str=""):
   return await UserService(db).update_user(user_id,org_id,user_data)
-  
\ No newline at end of file
+
+@router.put("bulk_update_users/{org_id}",response_model=UserBulkResult)
+@query_budget(None, None)  # one statement per chunk by design
+async def bulkUpdateUsers(user_data:UserBulkUpdate, db:AsyncSession  = Depends(get_db),org_id:str=""):
+  """Apply the same changes to the given `ids`, or to every active user matching `filter`."""
+  try:
+    return await UserService(db).bulk_update_users(org_id, user_data)
+  except ValueError as e:
+    raise HTTPException(400, str(e))
+
+
+@router.post("bulk_delete_users/{org_id}",response_model=UserBulkResult)
+@query_budget(None, None)  # one statement per chunk by design
+async def bulkDeleteUsers(selection:UserBulkSelection, db:AsyncSession  = Depends(get_db),org_id:str=""):
+  """Soft-delete the given `ids`, or every active user matching `filter`."""
+  return await UserService(db).bulk_delete_users(org_id, selection)
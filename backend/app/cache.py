@@ -0,0 +1,364 @@
+"""Read-through cache for repository lookups.
+
+Repositories ask the module-level `cache` for a row by `(namespace, key)`
+and hand it a loader that runs the SELECT on a miss. Cached values are the
+JSON-ready `model_dump()` of the response schema, so every backend stores
+the same thing and a hit never touches the ORM or the session.
+
+Backends:
+- `MemoryCache`: per-process LRU with a TTL and a hard entry limit.
+- `RedisCache`: any Redis-protocol client (`redis.asyncio.Redis`, or
+  `fakeredis.aioredis.FakeRedis` locally) shared by all workers.
+- `NullCache`: caching disabled.
+
+Write paths call `cache.invalidate(namespace, *keys)` after they commit.
+Invalidation hooks (see `app/invalidation.py`) forward those keys to other
+workers, which drop them with `cache.evict()`.
+
+A load that started before an invalidation may return the pre-write row,
+and storing it would serve that row for the whole TTL. Evicting a key marks
+this worker's loads of it in progress as stale, and their result is not
+stored. `RedisCache` also leaves a short-lived tombstone in place of a
+deleted entry. Fills check for it atomically, which covers loads running
+on other workers that the eviction has not reached yet.
+"""
+import json
+import logging
+from abc import ABC, abstractmethod
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.config import env_float, env_int
+from app.database import replica_engines
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # redis is optional; only RedisCache needs it
+    class WatchError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | redis | none
+CACHE_TTL_SECONDS = env_float("CACHE_TTL_SECONDS", 60.0)
+CACHE_MAX_ENTRIES = env_int("CACHE_MAX_ENTRIES", 10000)
+# how long a Redis entry refuses fills after an invalidation
+CACHE_TOMBSTONE_SECONDS = env_float("CACHE_TOMBSTONE_SECONDS", 5.0)
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+class CacheBackend(ABC):
+    """Interface every cache backend implements."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str) -> Any | None:
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        return None
+
+    async def delete(self, *keys: str) -> None:
+        return None
+
+    async def clear(self) -> None:
+        return None
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU with per-entry expiry and a hard entry limit."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+_TOMBSTONE = "!invalidated"  # never valid JSON, so never a cached value
+
+
+def _is_tombstone(raw) -> bool:
+    return raw == _TOMBSTONE or raw == _TOMBSTONE.encode()
+
+
+class RedisCache(CacheBackend):
+    """Backend for any asyncio Redis-protocol client; expiry is left to Redis.
+
+    `delete()` replaces entries with a tombstone for `tombstone_ttl` seconds,
+    and `set()` (WATCH / MULTI) does not overwrite one.
+    """
+
+    def __init__(self, client, prefix: str = "cache:", tombstone_ttl: float = CACHE_TOMBSTONE_SECONDS):
+        self.client = client
+        self.prefix = prefix
+        self.tombstone_ttl = tombstone_ttl
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None or _is_tombstone(raw):
+            return None
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        name = self.prefix + key
+        async with self.client.pipeline() as pipe:
+            try:
+                await pipe.watch(name)
+                if _is_tombstone(await pipe.get(name)):
+                    return  # invalidated moments ago; this row may predate the write
+                pipe.multi()
+                pipe.set(name, json.dumps(value), px=max(int(ttl * 1000), 1))
+                await pipe.execute()
+            except WatchError:
+                pass  # changed (or invalidated) since the check: leave it alone
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self.prefix + key, _TOMBSTONE, px=max(int(self.tombstone_ttl * 1000), 1))
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+def _session_policy(db) -> tuple[bool, bool]:
+    """(serve cached values, store loaded rows) for a lookup made on session `db`.
+
+    A replica may lag the primary, so rows read there are never stored: a
+    miss right after a write's invalidation would otherwise put the
+    pre-write row back for the whole TTL. With replicas configured, a read
+    on the primary is either a write path or a client pinned to the primary
+    for read-your-writes; it skips cached values (which another worker may
+    not have invalidated yet) and stores the fresh row.
+    """
+    if not replica_engines or db is None:
+        return True, True
+    if db.bind in replica_engines:
+        return True, False
+    return False, True
+
+
+class _Fill:
+    """One load in progress; set stale when its key is evicted meanwhile."""
+
+    __slots__ = ("stale",)
+
+    def __init__(self):
+        self.stale = False
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+class ReadThroughCache:
+    """Namespaced read-through cache with hit/miss counters.
+
+    Backend failures are logged and counted but never fail the request: a
+    broken cache degrades to a plain database read.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats: dict[str, CacheStats] = {}
+        self._invalidation_hooks: list[Callable[[str, tuple[str, ...]], None]] = []
+        self._fills: dict[str, list[_Fill]] = {}
+
+    def _stats_for(self, namespace: str) -> CacheStats:
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = CacheStats()
+        return stats
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"{namespace}:{key}"
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any | None]],
+        schema: Type[SchemaT],
+        db=None,
+    ) -> SchemaT | None:
+        """Return `schema` for `key`, calling `loader` (a SELECT on `db`) on a miss.
+
+        Misses that find no row are not cached, so a row created later is
+        visible immediately. Whether `db` may read or fill the cache depends
+        on the engine it is bound to (see `_session_policy`).
+        """
+        stats = self._stats_for(namespace)
+        cache_key = self._key(namespace, key)
+        use_cached, store = _session_policy(db)
+        cached = None
+        if use_cached:
+            try:
+                cached = await self.backend.get(cache_key)
+            except Exception:
+                stats.errors += 1
+                logger.warning("Cache read failed for %s", cache_key, exc_info=True)
+        if cached is not None:
+            stats.hits += 1
+            return schema.model_validate(cached)
+
+        stats.misses += 1
+        fill = _Fill()
+        self._fills.setdefault(cache_key, []).append(fill)
+        try:
+            row = await loader()
+        finally:
+            fills = self._fills[cache_key]
+            fills.remove(fill)
+            if not fills:
+                del self._fills[cache_key]
+        if row is None:
+            return None
+        item = schema.model_validate(row)
+        if not store or fill.stale:
+            return item
+        try:
+            await self.backend.set(cache_key, item.model_dump(mode="json"), self.ttl)
+        except Exception:
+            stats.errors += 1
+            logger.warning("Cache write failed for %s", cache_key, exc_info=True)
+        return item
+
+    def add_invalidation_hook(self, hook: Callable[[str, tuple[str, ...]], None]) -> None:
+        """Register a synchronous callback run for every `invalidate()` call."""
+        self._invalidation_hooks.append(hook)
+
+    async def invalidate(self, namespace: str, *keys: str) -> None:
+        """Drop cached entries; call after the write has been committed."""
+        if not keys:
+            return
+        await self.evict(namespace, *keys)
+        for hook in self._invalidation_hooks:
+            try:
+                hook(namespace, keys)
+            except Exception:
+                logger.warning("Cache invalidation hook failed for %s", namespace, exc_info=True)
+
+    async def evict(self, namespace: str, *keys: str) -> None:
+        """Drop entries from this cache only, without running invalidation hooks."""
+        if not keys:
+            return
+        stats = self._stats_for(namespace)
+        stats.invalidations += len(keys)
+        cache_keys = [self._key(namespace, key) for key in keys]
+        for cache_key in cache_keys:
+            for fill in self._fills.get(cache_key, ()):
+                fill.stale = True
+        try:
+            await self.backend.delete(*cache_keys)
+        except Exception:
+            stats.errors += 1
+            logger.warning("Cache invalidation failed for %s %s", namespace, keys, exc_info=True)
+
+    async def clear(self) -> None:
+        for fills in self._fills.values():
+            for fill in fills:
+                fill.stale = True
+        await self.backend.clear()
+
+    @property
+    def is_local(self) -> bool:
+        """True when entries live in this process and go stale across workers."""
+        return isinstance(self.backend, MemoryCache)
+
+    def stats(self) -> dict:
+        result = {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "namespaces": {name: stats.as_dict() for name, stats in self._stats.items()},
+        }
+        if isinstance(self.backend, MemoryCache):
+            result["entries"] = len(self.backend)
+            result["evictions"] = self.backend.evictions
+        return result
+
+
+def _build_backend(name: str) -> CacheBackend:
+    if name == "memory":
+        return MemoryCache(CACHE_MAX_ENTRIES)
+    if name == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        return RedisCache(redis_asyncio.from_url(REDIS_URL))
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r}, expected memory, redis or none")
+
+
+cache = ReadThroughCache(_build_backend(CACHE_BACKEND), CACHE_TTL_SECONDS)
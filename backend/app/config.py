@@ -0,0 +1,40 @@
+"""Small helpers for reading typed settings from the environment.
+
+Settings stay as module-level constants next to the code that uses them
+(see `app/database.py`, `app/service/auth.py`); these helpers only take care
+of parsing so every module treats "true"/"1"/"yes" and bad numbers the same way.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in _TRUE_VALUES
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be an integer, got {value!r}")
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be a number, got {value!r}")
@@ -0,0 +1,210 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Every `cache.invalidate()` in this worker queues `(entity, id)` pairs. They
+are de-duplicated and flushed as a few compact `pg_notify` payloads after a
+short window, so a bulk write costs a handful of notifications instead of
+one per row. Every worker holds one dedicated LISTEN connection and evicts
+the ids it receives from its in-process cache and organization directory.
+
+Payload (JSON, kept under Postgres' 8000 byte limit):
+    {"w": "<origin worker id>", "e": {"org": ["id", ...], "user": [...]}}
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from app.cache import cache
+from app.config import env_bool, env_float
+from app.database import DATABASE_URL, engine
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_BUS_ENABLED = env_bool("INVALIDATION_BUS_ENABLED", False)
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+# LISTEN needs a session-level connection: point this at Postgres directly
+# when DATABASE_URL goes through PgBouncer in transaction pooling mode.
+INVALIDATION_LISTEN_URL = os.getenv("INVALIDATION_LISTEN_URL", DATABASE_URL)
+INVALIDATION_FLUSH_SECONDS = env_float("INVALIDATION_FLUSH_SECONDS", 0.05)
+INVALIDATION_RECONNECT_SECONDS = env_float("INVALIDATION_RECONNECT_SECONDS", 2.0)
+_MAX_PAYLOAD_BYTES = 7900
+
+Handler = Callable[[list[str]], Awaitable[None]]
+
+
+class InvalidationBus:
+    def __init__(self, channel: str = INVALIDATION_CHANNEL):
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.sent_notifications = 0
+        self.published_ids = 0
+        self.received_ids = 0
+        self._pending: dict[str, set[str]] = defaultdict(set)
+        self._flush_task: asyncio.Task | None = None
+        self._listen_task: asyncio.Task | None = None
+        # the loop only keeps weak references to tasks; hold handler runs until they finish
+        self._handler_tasks: set[asyncio.Task] = set()
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._reconnect_handlers: list[Callable[[], Awaitable[None]]] = []
+
+    def subscribe(self, entity: str, handler: Handler) -> None:
+        """Run `handler(ids)` when another worker invalidates `entity` ids."""
+        self._handlers[entity].append(handler)
+
+    def on_reconnect(self, handler: Callable[[], Awaitable[None]]) -> None:
+        """Run after the listener reconnects; notifications may have been missed."""
+        self._reconnect_handlers.append(handler)
+
+    def publish(self, entity: str, ids) -> None:
+        """Queue ids for the next flush. Call only after the write committed."""
+        self._pending[entity].update(ids)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(INVALIDATION_FLUSH_SECONDS)
+        await self.flush()
+
+    def _payloads(self, pending: dict[str, set[str]]) -> list[str]:
+        payloads = []
+        current: dict[str, list[str]] = {}
+        size = 0
+        for entity, ids in pending.items():
+            for entity_id in ids:
+                item_size = len(entity_id) + 4
+                if current and size + item_size > _MAX_PAYLOAD_BYTES:
+                    payloads.append(json.dumps({"w": self.worker_id, "e": current}, separators=(",", ":")))
+                    current, size = {}, 0
+                if entity not in current:
+                    current[entity] = []
+                    size += len(entity) + 6
+                current[entity].append(entity_id)
+                size += item_size
+        if current:
+            payloads.append(json.dumps({"w": self.worker_id, "e": current}, separators=(",", ":")))
+        return payloads
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, defaultdict(set)
+        if not pending:
+            return
+        payloads = self._payloads(pending)
+        try:
+            async with engine.connect() as conn:
+                for payload in payloads:
+                    await conn.execute(select(func.pg_notify(self.channel, payload)))
+                await conn.commit()
+        except Exception:
+            # other workers fall back to TTL expiry for these keys
+            logger.warning("Failed to publish %d cache invalidation payloads", len(payloads), exc_info=True)
+            return
+        self.sent_notifications += len(payloads)
+        self.published_ids += sum(len(ids) for ids in pending.values())
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation payload")
+            return
+        if message.get("w") == self.worker_id:
+            return  # already evicted locally before publishing
+        for entity, ids in message.get("e", {}).items():
+            self.received_ids += len(ids)
+            for handler in self._handlers.get(entity, []):
+                task = asyncio.create_task(self._run_handler(entity, handler, ids))
+                self._handler_tasks.add(task)
+                task.add_done_callback(self._handler_tasks.discard)
+
+    @staticmethod
+    async def _run_handler(entity: str, handler: Handler, ids: list[str]) -> None:
+        try:
+            await handler(ids)
+        except Exception:
+            logger.warning("Invalidation handler for %s failed", entity, exc_info=True)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        dsn = make_url(INVALIDATION_LISTEN_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        first_connect = True
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except Exception:
+                logger.warning("Invalidation listener could not connect, retrying", exc_info=True)
+                await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+                continue
+            closed = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _conn: closed.done() or closed.set_result(None))
+            try:
+                await conn.add_listener(self.channel, self._on_notification)
+                if not first_connect:
+                    for handler in self._reconnect_handlers:
+                        await handler()
+                first_connect = False
+                logger.info("Listening for cache invalidations on %s", self.channel)
+                await closed
+                logger.warning("Invalidation listener connection lost, reconnecting")
+            except asyncio.CancelledError:
+                await conn.close()
+                raise
+            except Exception:
+                logger.warning("Invalidation listener failed, reconnecting", exc_info=True)
+                if not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+
+    async def start(self) -> None:
+        if self._listen_task is None:
+            self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._listen_task is not None,
+            "channel": self.channel,
+            "worker_id": self.worker_id,
+            "notifications_sent": self.sent_notifications,
+            "ids_published": self.published_ids,
+            "ids_received": self.received_ids,
+            "pending": sum(len(ids) for ids in self._pending.values()),
+        }
+
+
+bus = InvalidationBus()
+
+
+def install() -> None:
+    """Wire the bus into the cache and organization directory (app startup)."""
+    from app.service.org_directory import org_directory
+
+    cache.add_invalidation_hook(bus.publish)
+
+    async def evict_cached(namespace: str, ids: list[str]) -> None:
+        await cache.evict(namespace, *ids)
+
+    async def evict_orgs(ids: list[str]) -> None:
+        await evict_cached("org", ids)
+        org_directory.schedule_refresh()
+
+    async def evict_users(ids: list[str]) -> None:
+        await evict_cached("user", ids)
+
+    async def resync() -> None:
+        if cache.is_local:
+            await cache.clear()
+        org_directory.schedule_refresh()
+
+    bus.subscribe("org", evict_orgs)
+    bus.subscribe("user", evict_users)
+    bus.on_reconnect(resync)
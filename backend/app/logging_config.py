@@ -0,0 +1,116 @@
+"""Logging setup for the API process.
+
+`configure_logging()` installs a single root handler. With `LOG_QUEUE`
+on (the default) that handler is a `QueueHandler`: callers on the event
+loop only put the record on an in-memory queue, and a `QueueListener`
+thread does the formatting and the blocking writes to stderr.
+
+`LOG_FORMAT=json` writes one JSON object per line with the record's
+`extra` fields as top-level keys, for log shippers; `text` is the
+human-readable format used in development.
+
+Access logs (`app.access`, written by the HTTP middleware in `app/main.py`)
+are sampled with `ACCESS_LOG_SAMPLE_RATE`; server errors and requests
+slower than `ACCESS_LOG_SLOW_MS` are always logged.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from app.config import env_bool, env_float
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_QUEUE = env_bool("LOG_QUEUE", True)
+ACCESS_LOG_SAMPLE_RATE = env_float("ACCESS_LOG_SAMPLE_RATE", 1.0)  # 0.0 - 1.0
+ACCESS_LOG_SLOW_MS = env_float("ACCESS_LOG_SLOW_MS", 1000.0)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_configured = False
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message now, while its arguments still hold the values
+        # they had at the call, but leave all formatting (and exc_info) to the
+        # listener thread. The stock prepare() formats the whole record here.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    if LOG_FORMAT != "text":
+        raise ValueError(f"Unknown LOG_FORMAT {LOG_FORMAT!r}, expected text or json")
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def configure_logging() -> None:
+    """Install the root handler for `LOG_LEVEL` / `LOG_FORMAT` / `LOG_QUEUE`; safe to call twice."""
+    global _configured, _listener
+    if _configured:
+        return
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(_formatter())
+    if LOG_QUEUE:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler: logging.Handler = _QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = stream
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    _configured = True
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def access_log_sampled(status_code: int, elapsed_ms: float) -> bool:
+    """Whether this request goes to the access log."""
+    if status_code >= 500 or elapsed_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return ACCESS_LOG_SAMPLE_RATE >= 1.0 or random.random() < ACCESS_LOG_SAMPLE_RATE
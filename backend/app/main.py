@@ -1,18 +1,63 @@
+import asyncio
 import logging
-from fastapi import FastAPI
-from app.api.v1.routes import users, organization, otp, auth
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from app.api.v1.routes import users, organization, otp, auth, admin
 from fastapi.middleware.cors import CORSMiddleware
+from app import invalidation, metrics, profiling, query_stats
+from app.cache import cache
+from app.logging_config import access_log_sampled, configure_logging
+from app.api.v1.read_routing import PRIMARY_READS_COOKIE, READ_YOUR_WRITES_SECONDS, primary_reads_cookie_value
+from app.database import engine, replica_engines
+from app.service.jwt_keys import JWKS_MAX_AGE_SECONDS, key_ring
+from app.service.org_directory import org_directory
+from app.service.otp_sweeper import otp_sweeper, partitions_apply, sweeper_applies
+from app.service.token_revocation import revocation_index
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
 
 orgins=["*"]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  try:
+    await org_directory.load()
+  except Exception:
+    # login falls back to loading the directory on first use
+    logger.warning("Could not load organization directory at startup", exc_info=True)
+  try:
+    await revocation_index.load()
+  except Exception:
+    # until it loads, revocation checks go to the database
+    logger.warning("Could not load token revocation filter at startup", exc_info=True)
+  cache.add_invalidation_hook(org_directory.on_invalidate)
+  background = [
+    asyncio.create_task(org_directory.run_refresher()),
+    asyncio.create_task(revocation_index.run_refresher()),
+  ]
+  if key_ring.enabled:
+    background.append(asyncio.create_task(key_ring.run_reloader()))
+  if sweeper_applies():
+    background.append(asyncio.create_task(otp_sweeper.run_forever()))
+  elif partitions_apply():
+    # inserts into otp need a partition for today whether or not anything is swept
+    background.append(asyncio.create_task(otp_sweeper.run_forever(sweep=False)))
+  if invalidation.INVALIDATION_BUS_ENABLED:
+    invalidation.install()
+    await invalidation.bus.start()
+  try:
+    yield
+  finally:
+    for task in background:
+      task.cancel()
+    if invalidation.INVALIDATION_BUS_ENABLED:
+      await invalidation.bus.stop()
+    metrics.mark_process_dead()
 
 
 def create_app()->FastAPI:
@@ -24,6 +69,7 @@ def create_app()->FastAPI:
     openapi_url="/api/openapi.json",
     docs_url="/api/docs",
     debug=True,
+    lifespan=lifespan,
   )
 
   app.add_middleware(
@@ -35,19 +81,91 @@ def create_app()->FastAPI:
   )
 
 
-  # Middleware for logging requests (useful for debugging)
+  # Access log, sampled (see app/logging_config.py). Headers are never
+  # logged: they carry bearer tokens.
   @app.middleware("http")
   async def log_requests(request, call_next):
-      logger.debug(f"Request: {request.method} {request.url}")
-      logger.debug(f"Headers: {request.headers}")
+      start = time.perf_counter()
       response = await call_next(request)
-      logger.debug(f"Response status: {response.status_code}")
+      elapsed_ms = (time.perf_counter() - start) * 1000
+      if access_log_sampled(response.status_code, elapsed_ms):
+          stats = query_stats.current()
+          queries, db_ms = (stats.count, stats.total_time * 1000) if stats else (0, 0.0)
+          access_logger.info(
+              "%s %s %d %.1fms db=%d/%.1fms", request.method, request.url.path, response.status_code,
+              elapsed_ms, queries, db_ms,
+              extra={
+                  "method": request.method,
+                  "path": request.url.path,
+                  "status": response.status_code,
+                  "duration_ms": round(elapsed_ms, 1),
+                  "db_queries": queries,
+                  "db_ms": round(db_ms, 1),
+                  "db_slowest_ms": round(stats.slowest_time * 1000, 1) if stats else 0.0,
+              },
+          )
       return response
 
-  app.include_router(users.router, prefix="/api/users", tags=["users"])
-  app.include_router(organization.router, prefix="/api/organizations", tags=["organizations"])
-  app.include_router(otp.router, prefix="/api/otp", tags=["otp"])
-  app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
+  # Read-your-writes: a successful write pins this client's reads to the
+  # primary for a short window so replica lag never hides its own changes.
+  if replica_engines:
+      @app.middleware("http")
+      async def pin_reads_after_write(request, call_next):
+          response = await call_next(request)
+          if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+              response.set_cookie(
+                  PRIMARY_READS_COOKIE,
+                  primary_reads_cookie_value(),
+                  max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+                  httponly=True,
+                  samesite="lax",
+              )
+          return response
+
+  # per-request statement counts and timings, read by the access log above
+  # (so it must wrap it) and sent back as a Server-Timing header
+  app.add_middleware(query_stats.QueryStatsMiddleware)
+  for target in (engine, *replica_engines):
+      query_stats.install(target.sync_engine)
+
+  # only installed when enabled: otherwise requests never touch the profiler
+  if profiling.PROFILING_ENABLED:
+      app.add_middleware(profiling.ProfilingMiddleware)
+
+  if metrics.METRICS_ENABLED:
+      # added last, so it is the outermost middleware and times everything
+      app.add_middleware(metrics.MetricsMiddleware)
+      metrics.instrument_pool(engine, "primary")
+      for index, replica in enumerate(replica_engines):
+          metrics.instrument_pool(replica, f"replica{index}")
+
+      @app.get("/metrics", include_in_schema=False)
+      async def prometheus_metrics():
+          body, content_type = metrics.render()
+          return Response(body, media_type=content_type)
+
+  if key_ring.enabled:
+      # fail at startup, not on the first login, when the key directory is unusable
+      key_ring.load()
+
+      # public keys for services that verify our tokens themselves
+      @app.get("/.well-known/jwks.json", include_in_schema=False)
+      async def jwks(request: Request):
+          body, etag = key_ring.jwks()
+          headers = {"Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}", "ETag": etag}
+          if request.headers.get("if-none-match") == etag:
+              return Response(status_code=304, headers=headers)
+          return Response(body, media_type="application/json", headers=headers)
+
+  for router, prefix, tag in (
+    (users.router, "/api/users", "users"),
+    (organization.router, "/api/organizations", "organizations"),
+    (otp.router, "/api/otp", "otp"),
+    (auth.router, "/api/auth", "auth"),
+    (admin.router, "/api/admin", "admin"),
+  ):
+    app.include_router(router, prefix=prefix, tags=[tag])
+    metrics.label_routes(router, prefix)
   
   logger.info("FastAPI application created successfully")
   return app
@@ -0,0 +1,133 @@
+"""Allocation tracing for chasing slow memory growth in a worker.
+
+Everything here is driven from the admin API (`/api/admin/memory/*`) and
+acts on the worker that serves the call. `tracemalloc` is off until
+`start()` is called, since tracing every allocation slows the process down
+noticeably; `stop()` turns it off again and frees its bookkeeping.
+
+While tracing, `take_snapshot()` stores a snapshot under a small id (only
+the newest `MEMORY_SNAPSHOT_KEEP` are kept) and `top()` / `diff()` report
+the biggest allocation sites, or the biggest changes between two snapshots,
+grouped by file and line (or by file). Allocations made by tracemalloc
+itself are left out.
+
+`gc_report()` works without tracing: collector generation counts and the
+number of live instances of each ORM model class, the usual suspects when
+identity maps or cached result lists are kept alive.
+"""
+import gc
+import itertools
+import time
+import tracemalloc
+from collections import Counter
+from typing import Literal
+
+from app.config import env_int
+from app.database import Base
+
+MEMORY_SNAPSHOT_KEEP = env_int("MEMORY_SNAPSHOT_KEEP", 5)
+MEMORY_TRACE_FRAMES = env_int("MEMORY_TRACE_FRAMES", 1)
+
+GroupBy = Literal["lineno", "filename"]
+
+# snapshot id -> (taken at, snapshot); insertion ordered, oldest first
+_snapshots: dict[int, tuple[float, tracemalloc.Snapshot]] = {}
+_ids = itertools.count(1)
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def status() -> dict:
+    traced, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": traced,
+        "peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "snapshots": [
+            {"id": snapshot_id, "taken_at": taken_at}
+            for snapshot_id, (taken_at, _snapshot) in _snapshots.items()
+        ],
+    }
+
+
+def start(frames: int = MEMORY_TRACE_FRAMES) -> dict:
+    """Start tracing; a no-op when already tracing."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return status()
+
+
+def stop() -> dict:
+    """Stop tracing and drop the stored snapshots (their traces go with them)."""
+    tracemalloc.stop()
+    _snapshots.clear()
+    return status()
+
+
+def take_snapshot() -> int:
+    """Store a snapshot of the current allocations and return its id."""
+    if not tracemalloc.is_tracing():
+        raise ValueError("tracemalloc is not tracing; start it first")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    snapshot_id = next(_ids)
+    _snapshots[snapshot_id] = (time.time(), snapshot)
+    while len(_snapshots) > MEMORY_SNAPSHOT_KEEP:
+        del _snapshots[next(iter(_snapshots))]
+    return snapshot_id
+
+
+def _snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    try:
+        return _snapshots[snapshot_id][1]
+    except KeyError:
+        raise LookupError(f"No snapshot {snapshot_id}")
+
+
+def _site(traceback: tracemalloc.Traceback, group_by: GroupBy) -> str:
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+def top(snapshot_id: int, limit: int, group_by: GroupBy = "lineno") -> list[dict]:
+    """Biggest allocation sites in one snapshot."""
+    stats = _snapshot(snapshot_id).statistics(group_by)
+    return [
+        {"site": _site(stat.traceback, group_by), "size_bytes": stat.size, "count": stat.count}
+        for stat in stats[:limit]
+    ]
+
+
+def diff(base_id: int, current_id: int, limit: int, group_by: GroupBy = "lineno") -> list[dict]:
+    """Allocation sites that changed most from `base_id` to `current_id`."""
+    stats = _snapshot(current_id).compare_to(_snapshot(base_id), group_by)
+    return [
+        {
+            "site": _site(stat.traceback, group_by),
+            "size_bytes": stat.size,
+            "size_diff_bytes": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def gc_report() -> dict:
+    """Collector state and live ORM instances per model class."""
+    models = {mapper.class_ for mapper in Base.registry.mappers}
+    objects = gc.get_objects()
+    instances = Counter(type(obj).__name__ for obj in objects if type(obj) in models)
+    return {
+        "gc_counts": gc.get_count(),
+        "gc_thresholds": gc.get_threshold(),
+        "gc_stats": gc.get_stats(),
+        "tracked_objects": len(objects),
+        "model_instances": {name: instances[name] for name in sorted(model.__name__ for model in models)},
+    }
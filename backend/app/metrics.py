@@ -0,0 +1,181 @@
+"""Prometheus metrics, served at `GET /metrics`.
+
+HTTP metrics are recorded by `MetricsMiddleware` (pure ASGI, so it adds no
+extra task per request) and labelled with the route template, e.g.
+`/api/usersget_user_by_id/{user_id}/{org_id}`, never the raw path, which
+keeps label cardinality bounded (`label_routes()` supplies the router
+prefixes). Pool gauges are updated from SQLAlchemy pool events; auth
+counters are incremented by the services.
+
+All recording happens on the event-loop thread, so the per-value mutex
+inside `prometheus_client` is never contended, and labelled children are
+resolved once and kept in plain dicts so the hot path skips `labels()`.
+
+Multiple workers: set `PROMETHEUS_MULTIPROC_DIR` to an empty directory
+shared by the workers (wipe it before the server starts). Every worker then
+writes its samples there and a scrape of any worker returns the sum over all
+of them. Without it, each worker reports only its own numbers.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.config import env_bool
+
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to produce the response, by route",
+    ["method", "route"], buckets=_LATENCY_BUCKETS,
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", ["method"],
+    multiprocess_mode="livesum",
+)
+
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ["engine"],
+    multiprocess_mode="livesum",
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Overflow connections open above the pool size", ["engine"],
+    multiprocess_mode="livesum",
+)
+db_pool_size = Gauge(
+    "db_pool_size", "Configured persistent connections", ["engine"],
+    multiprocess_mode="livesum",
+)
+
+otp_issued = Counter("otp_issued_total", "OTP codes issued")
+otp_verifications = Counter("otp_verifications_total", "OTP verification attempts", ["result"])
+otp_expired = Counter("otp_expired_total", "Pending OTP rows marked expired by the sweeper")
+tokens_refreshed = Counter("tokens_refreshed_total", "Refresh token exchanges", ["result"])
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for a scrape."""
+    if MULTIPROCESS:
+        # per scrape, as prometheus_client documents: reads every worker's files
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# id(route) -> full path template; routes of an included router only know
+# their own path, not the prefix they were mounted under
+_route_templates: dict[int, str] = {}
+
+
+def label_routes(router, prefix: str) -> None:
+    """Record the full path templates of `router`'s routes as mounted under `prefix`."""
+    for route in router.routes:
+        path = getattr(route, "path", None)
+        if path is not None:
+            _route_templates[id(route)] = prefix + path
+
+
+def _route_label(scope: dict) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    return _route_templates.get(id(route)) or getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Counts, times and tracks in-flight HTTP requests."""
+
+    def __init__(self, app):
+        self.app = app
+        self._requests: dict[tuple[str, str, str], Counter] = {}
+        self._durations: dict[tuple[str, str], Histogram] = {}
+        self._in_progress: dict[str, Gauge] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = self._in_progress.get(method)
+        if in_progress is None:
+            in_progress = self._in_progress[method] = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            route = _route_label(scope)
+            key = (method, route, str(status_code))
+            counter = self._requests.get(key)
+            if counter is None:
+                counter = self._requests[key] = http_requests.labels(*key)
+            counter.inc()
+            duration = self._durations.get(key[:2])
+            if duration is None:
+                duration = self._durations[key[:2]] = http_request_duration.labels(method, route)
+            duration.observe(elapsed)
+
+
+def instrument_pool(target: AsyncEngine, name: str) -> None:
+    """Keep the pool gauges of `target` current via checkout/checkin events."""
+    pool = target.pool
+    if not isinstance(pool, QueuePool):
+        return  # SQLite and NullPool engines have nothing to saturate
+    checked_out = db_pool_checked_out.labels(name)
+    overflow = db_pool_overflow.labels(name)
+    db_pool_size.labels(name).set(pool.size())
+
+    # the engine's current pool is looked up each time: dispose() replaces it
+    def on_checkout(*args) -> None:
+        current = target.sync_engine.pool
+        checked_out.set(current.checkedout())
+        # QueuePool counts overflow from -pool_size until the pool is full
+        overflow.set(max(current.overflow(), 0))
+
+    def on_checkin(*args) -> None:
+        # fires before the connection is handed back: it is still counted as
+        # checked out, and it will be closed (ending an overflow slot) if the
+        # pool's queue is already full
+        current = target.sync_engine.pool
+        returning_overflow = current.checkedin() >= current.size()
+        checked_out.set(current.checkedout() - 1)
+        overflow.set(max(current.overflow() - returning_overflow, 0))
+
+    event.listen(target.sync_engine, "checkout", on_checkout)
+    event.listen(target.sync_engine, "checkin", on_checkin)
@@ -0,0 +1,28 @@
+"""users organization_id email index
+
+Revision ID: 3c9e1f0a7b21
+Revises: da2b2c495195
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f0a7b21'
+down_revision: Union[str, Sequence[str], None] = 'da2b2c495195'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_organization_id_email', 'users', ['organization_id', 'email'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_organization_id_email', table_name='users')
@@ -0,0 +1,36 @@
+"""keyset pagination indexes
+
+Revision ID: 5e8a1c3f7d24
+Revises: b7c4e2a9d5f1
+Create Date: 2026-10-18 15:21:06.447390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1c3f7d24'
+down_revision: Union[str, Sequence[str], None] = 'b7c4e2a9d5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently so large tenants' tables stay writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_org_active_created_at_id', 'users', ['organization_id', 'created_at', 'id'],
+                        unique=False, postgresql_where=sa.text('status = true'), postgresql_concurrently=True)
+        op.create_index('ix_organizations_active_created_at_id', 'organizations', ['created_at', 'id'],
+                        unique=False, postgresql_where=sa.text('status = true'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_organizations_active_created_at_id', table_name='organizations',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_users_org_active_created_at_id', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""otp sweeper indexes and archive table
+
+Revision ID: 8f2a6d4c1e93
+Revises: 3c9e1f0a7b21
+Create Date: 2026-10-18 11:02:17.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2a6d4c1e93'
+down_revision: Union[str, Sequence[str], None] = '3c9e1f0a7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the sweeper scans pending rows by expiry and old rows by creation time
+    op.create_index('ix_otp_pending_expires_at', 'otp', ['expires_at'], unique=False,
+                    postgresql_where=sa.text("status = 'PENDING'"))
+    op.create_index('ix_otp_created_at', 'otp', ['created_at'], unique=False)
+    op.create_table('otp_archive',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('organization_id', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('code', sa.String(length=5), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'VERIFIED', 'EXPIRED', name='otpstatusenum', create_type=False), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('verified_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_otp_archive_created_at'), 'otp_archive', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_otp_archive_created_at'), table_name='otp_archive')
+    op.drop_table('otp_archive')
+    op.drop_index('ix_otp_created_at', table_name='otp')
+    op.drop_index('ix_otp_pending_expires_at', table_name='otp')
@@ -0,0 +1,126 @@
+"""partition otp by created_at
+
+Revision ID: b7c4e2a9d5f1
+Revises: 8f2a6d4c1e93
+Create Date: 2026-10-18 13:40:51.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c4e2a9d5f1'
+down_revision: Union[str, Sequence[str], None] = '8f2a6d4c1e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OTP_COLUMNS = "id, user_id, organization_id, phone, code, status, created_at, updated_at, expires_at, verified_at"
+OTP_INDEXES = ['ix_otp_id', 'ix_otp_organization_id', 'ix_otp_phone', 'ix_otp_user_id', 'ix_otp_pending_expires_at']
+
+# daily partitions from the oldest row up to a week ahead; the OTP sweeper
+# takes over from there (app/service/otp_partitions.py)
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    day timestamptz := date_trunc('day', coalesce((SELECT min(created_at) FROM otp_unpartitioned), now()), 'UTC');
+    last timestamptz := date_trunc('day', now(), 'UTC') + interval '8 days';
+BEGIN
+    WHILE day < last LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF otp FOR VALUES FROM (%L) TO (%L)',
+                       'otp_p' || to_char(day, 'YYYYMMDD'), day, day + interval '1 day');
+        day := day + interval '1 day';
+    END LOOP;
+END $$;
+"""
+
+
+def _otp_columns(timestamp_type):
+    return [
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('organization_id', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('code', sa.String(length=5), nullable=False),
+        sa.Column('status', postgresql.ENUM('PENDING', 'VERIFIED', 'EXPIRED', name='otpstatusenum', create_type=False), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', timestamp_type, nullable=False),
+        sa.Column('verified_at', timestamp_type, nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    ]
+
+
+def _create_otp_indexes() -> None:
+    op.create_index(op.f('ix_otp_id'), 'otp', ['id'], unique=False)
+    op.create_index(op.f('ix_otp_organization_id'), 'otp', ['organization_id'], unique=False)
+    op.create_index(op.f('ix_otp_phone'), 'otp', ['phone'], unique=False)
+    op.create_index(op.f('ix_otp_user_id'), 'otp', ['user_id'], unique=False)
+    op.create_index('ix_otp_pending_expires_at', 'otp', ['expires_at'], unique=False,
+                    postgresql_where=sa.text("status = 'PENDING'"))
+
+
+def _move_aside(old_name: str) -> None:
+    # frees the table, primary key and index names for the replacement
+    op.rename_table('otp', old_name)
+    op.execute(f"ALTER TABLE {old_name} RENAME CONSTRAINT otp_pkey TO {old_name}_pkey")
+    for index in OTP_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # partition bounds and naming are in UTC
+    op.execute("SET LOCAL TIME ZONE 'UTC'")
+    _move_aside('otp_unpartitioned')
+    op.drop_index('ix_otp_created_at', table_name='otp_unpartitioned')
+
+    op.create_table('otp',
+    *_otp_columns(sa.DateTime(timezone=True)),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.execute(CREATE_PARTITIONS)
+    _create_otp_indexes()
+
+    # expires_at/verified_at were naive UTC timestamps
+    op.execute(
+        f"INSERT INTO otp ({OTP_COLUMNS}) "
+        "SELECT id, user_id, organization_id, phone, code, status, created_at, updated_at, "
+        "expires_at AT TIME ZONE 'UTC', verified_at AT TIME ZONE 'UTC' FROM otp_unpartitioned"
+    )
+    op.drop_table('otp_unpartitioned')
+
+    for column in ('expires_at', 'verified_at'):
+        op.alter_column('otp_archive', column,
+                   existing_type=postgresql.TIMESTAMP(),
+                   type_=sa.DateTime(timezone=True),
+                   postgresql_using=f"{column} AT TIME ZONE 'UTC'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("SET LOCAL TIME ZONE 'UTC'")
+    for column in ('expires_at', 'verified_at'):
+        op.alter_column('otp_archive', column,
+                   existing_type=sa.DateTime(timezone=True),
+                   type_=postgresql.TIMESTAMP(),
+                   postgresql_using=f"{column} AT TIME ZONE 'UTC'")
+
+    _move_aside('otp_partitioned')
+    op.create_table('otp',
+    *_otp_columns(sa.DateTime()),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_otp_indexes()
+    op.create_index('ix_otp_created_at', 'otp', ['created_at'], unique=False)
+    op.execute(
+        f"INSERT INTO otp ({OTP_COLUMNS}) "
+        "SELECT id, user_id, organization_id, phone, code, status, created_at, updated_at, "
+        "expires_at AT TIME ZONE 'UTC', verified_at AT TIME ZONE 'UTC' FROM otp_partitioned"
+    )
+    # drops every partition with it
+    op.drop_table('otp_partitioned')
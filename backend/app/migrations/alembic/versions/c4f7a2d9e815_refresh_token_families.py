@@ -0,0 +1,46 @@
+"""refresh token families
+
+Revision ID: c4f7a2d9e815
+Revises: 5e8a1c3f7d24
+Create Date: 2026-10-18 19:40:12.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a2d9e815'
+down_revision: Union[str, Sequence[str], None] = '5e8a1c3f7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('refresh_token_families',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('current_jti', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('rotated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_refresh_token_families_user_id'), 'refresh_token_families', ['user_id'], unique=False)
+    op.create_index(op.f('ix_refresh_token_families_expires_at'), 'refresh_token_families', ['expires_at'], unique=False)
+    # the revocation filter loads recent revocations by revoked_at
+    op.create_index('ix_refresh_token_families_revoked_at', 'refresh_token_families', ['revoked_at'], unique=False,
+                    postgresql_where=sa.text('revoked_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_token_families_revoked_at', table_name='refresh_token_families')
+    op.drop_index(op.f('ix_refresh_token_families_expires_at'), table_name='refresh_token_families')
+    op.drop_index(op.f('ix_refresh_token_families_user_id'), table_name='refresh_token_families')
+    op.drop_table('refresh_token_families')
@@ -1,5 +1,6 @@
 from .user import User, ThemeEnum
 from .organization import Organization
-from .otp import OTP
+from .otp import OTP, OTPArchive
+from .token_family import RefreshTokenFamily
 
-__all__ = ["User", "ThemeEnum","Organization", "OTP"]
+__all__ = ["User", "ThemeEnum","Organization", "OTP", "OTPArchive", "RefreshTokenFamily"]
@@ -1,5 +1,5 @@
 from typing import List, Optional, TYPE_CHECKING
-from sqlalchemy import String
+from sqlalchemy import String, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 from app.model.common import CommonBase
@@ -11,6 +11,10 @@ if TYPE_CHECKING:
 
 class Organization(CommonBase, Base):
     __tablename__ = "organizations"
+    __table_args__ = (
+        # keyset pagination of active organizations
+        Index("ix_organizations_active_created_at_id", "created_at", "id", postgresql_where=text("status = true")),
+    )
 
     org_code: Mapped[str] = mapped_column(String)
     org_name: Mapped[str] = mapped_column(String)
@@ -1,5 +1,5 @@
 from app.database import Base
-from sqlalchemy import String, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Boolean, DateTime, ForeignKey, Index, PrimaryKeyConstraint, func, text, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timedelta
 from enum import Enum
@@ -17,7 +17,20 @@ class OTPStatusEnum(str, Enum):
 
 
 class OTP(CommonBase, Base):
+    """Range-partitioned by `created_at` on Postgres; partitions are created
+    and retired by app/service/otp_partitions.py."""
     __tablename__ = "otp"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        # used by the expiry sweeper (app/service/otp_sweeper.py)
+        Index("ix_otp_pending_expires_at", "expires_at", postgresql_where=text("status = 'PENDING'")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Postgres requires the partition key in the primary key
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
 
     user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
     organization_id: Mapped[str] = mapped_column(String, ForeignKey("organizations.id"), index=True)
@@ -26,5 +39,22 @@ class OTP(CommonBase, Base):
     status: Mapped[OTPStatusEnum] = mapped_column(
         SQLEnum(OTPStatusEnum), default=OTPStatusEnum.PENDING
     )
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
-    verified_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class OTPArchive(Base):
+    """Rows copied out of retired `otp` partitions when
+    `OTP_RETENTION_MODE=archive`; same columns, no foreign keys."""
+    __tablename__ = "otp_archive"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String)
+    organization_id: Mapped[str] = mapped_column(String)
+    phone: Mapped[str] = mapped_column(String)
+    code: Mapped[str] = mapped_column(String(5))
+    status: Mapped[OTPStatusEnum] = mapped_column(SQLEnum(OTPStatusEnum))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
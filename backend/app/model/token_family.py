@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RefreshTokenFamily(Base):
+    """One row per login: every refresh token rotated from that login shares
+    its id (`fid` claim). Only `current_jti` may be exchanged; presenting any
+    other token of the family is reuse and revokes it (see
+    app/service/token_revocation.py)."""
+    __tablename__ = "refresh_token_families"
+    __table_args__ = (
+        # incremental loads of the revocation filter read recent revocations
+        Index("ix_refresh_token_families_revoked_at", "revoked_at", postgresql_where=text("revoked_at IS NOT NULL")),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
+    current_jti: Mapped[str] = mapped_column(String)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    rotated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # exp of the newest refresh token; after it the row can be deleted
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String,Boolean,DateTime, ForeignKey
+from sqlalchemy import String,Boolean,DateTime, ForeignKey, Index, text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.database import Base
@@ -18,6 +18,15 @@ class ThemeEnum(str,Enum):
   
 class User(CommonBase, Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # login looks users up by (organization_id, email)
+        Index("ix_users_organization_id_email", "organization_id", "email"),
+        # keyset pagination of an organization's active users
+        Index(
+            "ix_users_org_active_created_at_id", "organization_id", "created_at", "id",
+            postgresql_where=text("status = true"),
+        ),
+    )
 
     organization_id: Mapped[str] = mapped_column(
         ForeignKey("organizations.id"),
@@ -0,0 +1,157 @@
+"""Opt-in CPU profiling of single requests.
+
+With `PROFILING_ENABLED=true`, `ProfilingMiddleware` runs a request under
+pyinstrument's sampling profiler when either
+
+- the request carries a valid `X-Profile` header, minted by
+  `POST /api/admin/profiles/token` (an expiry and its HMAC under
+  `PROFILE_SIGNING_KEY`, so only holders of the admin token can ask for a
+  profile and a leaked header stops working after its TTL), or
+- a random draw falls under `PROFILE_SAMPLE_RATE` (0 by default).
+
+pyinstrument follows the request's async context, so time spent by other
+requests on the same event loop is not attributed to it. Each profile is
+written in speedscope's JSON format (open it at https://www.speedscope.app)
+to `PROFILE_DIR`, which keeps only the newest `PROFILE_KEEP` files; the
+response names its file in an `X-Profile-Id` header. The admin API lists
+and downloads them.
+
+Disabled (the default), the middleware is not installed and pyinstrument is
+never imported, so requests pay nothing for it.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import secrets
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = env_bool("PROFILING_ENABLED", False)
+PROFILE_SAMPLE_RATE = env_float("PROFILE_SAMPLE_RATE", 0.0)  # 0.0 - 1.0
+PROFILE_SIGNING_KEY = os.getenv("PROFILE_SIGNING_KEY", "")
+PROFILE_INTERVAL_MS = env_float("PROFILE_INTERVAL_MS", 1.0)
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or Path(tempfile.gettempdir()) / "api-profiles")
+PROFILE_KEEP = env_int("PROFILE_KEEP", 50)
+PROFILE_TOKEN_MAX_TTL_SECONDS = 3600
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SUFFIX = ".speedscope.json"
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _signature(expires: int) -> str:
+    return hmac.new(PROFILE_SIGNING_KEY.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+
+
+def profile_token(ttl_seconds: int) -> tuple[str, int]:
+    """`X-Profile` header value valid for `ttl_seconds`, and its expiry."""
+    if not PROFILE_SIGNING_KEY:
+        raise ValueError("PROFILE_SIGNING_KEY is not set")
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_signature(expires)}", expires
+
+
+def _valid_token(value: str) -> bool:
+    if not PROFILE_SIGNING_KEY:
+        return False
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+def list_profiles() -> list[dict]:
+    """Profiles in the ring directory, newest first."""
+    profiles = []
+    try:
+        entries = list(os.scandir(PROFILE_DIR))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if not entry.name.endswith(PROFILE_SUFFIX):
+            continue
+        try:
+            info = entry.stat()
+        except FileNotFoundError:
+            continue  # pruned by another worker meanwhile
+        profiles.append({"name": entry.name, "size": info.st_size, "created": info.st_mtime})
+    profiles.sort(key=lambda profile: profile["created"], reverse=True)
+    return profiles
+
+
+def profile_path(name: str) -> Path | None:
+    """Path of a stored profile, or None for unknown (or unsafe) names."""
+    if not name.endswith(PROFILE_SUFFIX) or _UNSAFE_CHARS.search(name) or name.startswith("."):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
+
+
+def _write(name: str, profile: str) -> None:
+    # runs in a worker thread: writing and pruning are blocking I/O
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    partial = PROFILE_DIR / f".{name}.partial"
+    partial.write_text(profile)
+    partial.replace(PROFILE_DIR / name)
+    for stale in list_profiles()[PROFILE_KEEP:]:
+        try:
+            (PROFILE_DIR / stale["name"]).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """Profiles signed or sampled HTTP requests; passes the rest straight through."""
+
+    def __init__(self, app):
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self.app = app
+        self._profiler_class = Profiler
+        self._renderer_class = SpeedscopeRenderer
+
+    def _wanted(self, scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER:
+                return _valid_token(value.decode("latin-1"))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        path = _UNSAFE_CHARS.sub("_", scope["path"]).strip("_")[:80] or "root"
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{secrets.token_hex(3)}"
+            f"-{scope['method']}-{path}{PROFILE_SUFFIX}"
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = self._profiler_class(interval=PROFILE_INTERVAL_MS / 1000, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            try:
+                # rendering is CPU work on the whole sample tree: keep it off the loop too
+                await asyncio.to_thread(lambda: _write(name, profiler.output(renderer=self._renderer_class())))
+            except Exception:
+                logger.warning("Could not store profile %s", name, exc_info=True)
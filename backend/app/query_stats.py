@@ -0,0 +1,149 @@
+"""Per-request SQL statistics.
+
+`install()` hooks `before/after_cursor_execute` on an engine. While a
+request is being handled (`QueryStatsMiddleware`), every statement it runs
+is counted and timed into a `QueryStats` held in a context variable, so
+work done by the request's own tasks is included and background jobs are
+not. The totals are sent back as a `Server-Timing` header and written to
+the access log.
+
+Strict mode (`QUERY_BUDGET_STRICT=true`, meant for tests and local runs)
+makes a request fail as soon as it runs more statements than its budget or
+repeats one statement shape `QUERY_REPEAT_LIMIT` times, the usual sign of
+an N+1 loop. Budgets default to `QUERY_BUDGET_DEFAULT`; a route sets its
+own with `@query_budget(...)` placed under the router decorator (batch
+endpoints that loop over chunks by design lift both limits).
+"""
+import contextvars
+import time
+from collections import Counter
+from typing import Callable, TypeVar
+
+from sqlalchemy import event
+
+from app.config import env_bool, env_int
+
+SERVER_TIMING_HEADER = env_bool("SERVER_TIMING_HEADER", True)
+QUERY_BUDGET_STRICT = env_bool("QUERY_BUDGET_STRICT", False)
+QUERY_BUDGET_DEFAULT = env_int("QUERY_BUDGET_DEFAULT", 20)
+QUERY_REPEAT_LIMIT = env_int("QUERY_REPEAT_LIMIT", 5)
+
+_STATEMENT_CHARS = 200  # of a statement quoted in errors and logs
+
+EndpointT = TypeVar("EndpointT", bound=Callable)
+
+_current: contextvars.ContextVar["QueryStats | None"] = contextvars.ContextVar("query_stats", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request goes over its query budget."""
+
+
+def query_budget(
+    limit: int | None, repeat_limit: int | None = QUERY_REPEAT_LIMIT
+) -> Callable[[EndpointT], EndpointT]:
+    """Set the strict-mode limits of one endpoint; None lifts a limit."""
+    def mark(endpoint: EndpointT) -> EndpointT:
+        endpoint.query_budget = (limit, repeat_limit)
+        return endpoint
+    return mark
+
+
+class QueryStats:
+    """Statements run while handling one request."""
+
+    def __init__(self, scope: dict | None = None):
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+        self.shapes: Counter[str] = Counter()
+
+    def limits(self) -> tuple[int | None, int | None]:
+        # the route is only known once routing has run, so look it up lazily
+        route = (self.scope or {}).get("route")
+        endpoint = getattr(route, "endpoint", None)
+        return getattr(endpoint, "query_budget", (QUERY_BUDGET_DEFAULT, QUERY_REPEAT_LIMIT))
+
+    def check(self, statement: str) -> None:
+        """Strict mode: fail before running a statement that breaks the limits."""
+        budget, repeat_limit = self.limits()
+        if budget is not None and self.count + 1 > budget:
+            raise QueryBudgetExceeded(f"{self._where()} ran more than {budget} statements")
+        if repeat_limit is not None and self.shapes[statement] + 1 >= repeat_limit:
+            raise QueryBudgetExceeded(
+                f"{self._where()} ran the same statement {repeat_limit} times (N+1?): "
+                f"{statement[:_STATEMENT_CHARS]}"
+            )
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        value = f'db;dur={self.total_time * 1000:.1f};desc="{self.count} queries"'
+        if self.count:
+            value += f", db-slowest;dur={self.slowest_time * 1000:.1f}"
+        return value
+
+    def _where(self) -> str:
+        scope = self.scope or {}
+        return f"{scope.get('method', '')} {scope.get('path', '')}".strip() or "request"
+
+
+def current() -> QueryStats | None:
+    """Stats of the request being handled, if any."""
+    return _current.get()
+
+
+def install(sync_engine) -> None:
+    """Collect statistics for statements run on `sync_engine`."""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None:
+            return
+        if QUERY_BUDGET_STRICT:
+            stats.check(statement)
+        context._query_stats_start = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        start = getattr(context, "_query_stats_start", None)
+        if stats is None or start is None:
+            return
+        stats.record(statement, time.perf_counter() - start)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Tracks each HTTP request's statements and adds a `Server-Timing` header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats(scope)
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            # streamed bodies only count the statements run before the first chunk
+            if message["type"] == "http.response.start" and SERVER_TIMING_HEADER:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
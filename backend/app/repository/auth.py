@@ -2,34 +2,32 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.model.user import User
 from app.model.organization import Organization
-from app.model.otp import OTP, OTPStatusEnum
 
 
 class AuthRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_user_by_email_and_org_code(self, email: str, org_code: str) -> User | None:
+    async def get_active_user_by_org_and_email(self, organization_id: str, email: str) -> User | None:
+        """Single-table lookup served by ix_users_organization_id_email; the
+        caller resolves and checks the organization beforehand."""
         result = await self.db.execute(
-            select(User)
-            .join(Organization, User.organization_id == Organization.id)
-            .where(
+            select(User).where(
+                (User.organization_id == organization_id) &
                 (User.email == email) &
-                (Organization.org_code == org_code) &
-                (User.status == True) &
-                (Organization.status == True)
+                (User.status == True)
             )
         )
         return result.scalars().first()
 
-    async def get_user_and_org_by_verified_otp(self, otp_id: str) -> tuple[User, Organization] | None:
+    async def get_user_and_org(self, user_id: str, organization_id: str) -> tuple[User, Organization] | None:
+        """User and organization for a verified OTP; works for every OTP store."""
         result = await self.db.execute(
             select(User, Organization)
             .join(Organization, User.organization_id == Organization.id)
-            .join(OTP, OTP.user_id == User.id)
             .where(
-                (OTP.id == otp_id) &
-                (OTP.status == OTPStatusEnum.VERIFIED)
+                (User.id == user_id) &
+                (User.organization_id == organization_id)
             )
         )
         row = result.first()
@@ -1,15 +1,26 @@
 import uuid
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import RowMapping, func, insert, tuple_, update
+from app.cache import cache
 from app.model.organization import Organization
-from app.schema.organization import OrganizationCreate, OrganizationUpdate
+from app.schema.organization import OrganizationCreate, OrganizationResponse, OrganizationUpdate
+from app.schema.pagination import PageKey
+
+CACHE_NAMESPACE = "org"
 
 class OrganizationRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_org_by_id(self, org_id: str) -> Organization | None:
+    async def get_org_by_id(self, org_id: str) -> OrganizationResponse | None:
+        """Cached lookup; write paths use `_get_org_row` for the ORM instance."""
+        return await cache.get_or_load(
+            CACHE_NAMESPACE, org_id, lambda: self._get_org_row(org_id), OrganizationResponse, self.db
+        )
+
+    async def _get_org_row(self, org_id: str) -> Organization | None:
         result = await self.db.execute(
             select(Organization).where(Organization.id == org_id)
         )
@@ -22,28 +33,67 @@ class OrganizationRepository:
         except Exception:
             raise ValueError("Invalid organization data")
         payload['id'] = str(uuid.uuid4())
-        new_org = Organization(**payload)
-        self.db.add(new_org)
+        # INSERT ... RETURNING brings back server defaults (created_at) without a refresh
+        new_org = await self.db.scalar(insert(Organization).values(**payload).returning(Organization))
         await self.db.commit()
-        await self.db.refresh(new_org)
+        await cache.invalidate(CACHE_NAMESPACE, new_org.id)
         return new_org
     
-    async def get_all_orgs(self) -> list[Organization]:
-        result = await self.db.execute(select(Organization).where(Organization.status == True))
-        return list(result.scalars().all())
+    async def get_org_directory_rows(self, changed_since: datetime | None = None) -> list:
+        """(id, org_code, status, last_change) rows, optionally only those changed after `changed_since`."""
+        last_change = func.coalesce(Organization.updated_at, Organization.created_at)
+        stmt = select(Organization.id, Organization.org_code, Organization.status, last_change.label("last_change"))
+        if changed_since is not None:
+            stmt = stmt.where(last_change > changed_since)
+        result = await self.db.execute(stmt)
+        return list(result.all())
+
+    async def get_orgs_version(self) -> tuple[datetime | None, int]:
+        """(latest change over all rows, active row count) for the org list.
+
+        Soft-deletes bump `updated_at` too, so the max covers every write
+        and the count catches rows leaving the active set.
+        """
+        result = await self.db.execute(
+            select(
+                func.max(func.coalesce(Organization.updated_at, Organization.created_at)),
+                func.count().filter(Organization.status == True),
+            )
+        )
+        last_change, active = result.one()
+        return last_change, active
+
+    async def get_all_orgs(self, limit: int, after: PageKey | None = None) -> list[RowMapping]:
+        """Up to `limit` active organizations ordered by (created_at, id), strictly after `after`.
+
+        Plain row mappings: list pages are serialized, never modified, so
+        they skip building ORM instances.
+        """
+        stmt = select(Organization.__table__).where(Organization.status == True)
+        if after is not None:
+            stmt = stmt.where(tuple_(Organization.created_at, Organization.id) > tuple_(*after))
+        result = await self.db.execute(stmt.order_by(Organization.created_at, Organization.id).limit(limit))
+        return list(result.mappings().all())
     
-    async def delete_org(self, org_id: str) -> None:
-        org = await self.get_org_by_id(org_id)
+    async def delete_org(self, org_id: str) -> Organization | None:
+        """Soft-delete in one UPDATE ... RETURNING; None if no such organization."""
+        org = await self.db.scalar(
+            update(Organization).where(Organization.id == org_id).values(status=False).returning(Organization)
+        )
+        await self.db.commit()
         if org:
-            await self.db.execute(update(Organization).where(Organization.id == org_id).values(status=False))
-            await self.db.commit()
+            await cache.invalidate(CACHE_NAMESPACE, org_id)
+        return org
 
-    async def update_org(self, org_id: str, org_data: OrganizationUpdate) -> Organization:
-        org = await self.get_org_by_id(org_id)
+    async def update_org(self, org_id: str, org_data: OrganizationUpdate) -> Organization | None:
+        """Apply the set fields in one UPDATE ... RETURNING; None if no such organization."""
+        changes = org_data.model_dump(exclude_unset=True)
+        if not changes:
+            return await self._get_org_row(org_id)
+        org = await self.db.scalar(
+            update(Organization).where(Organization.id == org_id).values(**changes).returning(Organization)
+        )
+        await self.db.commit()
         if org:
-            for key, value in org_data.model_dump(exclude_unset=True).items():
-                setattr(org, key, value)
-            self.db.add(org)
-            await self.db.commit()
-            await self.db.refresh(org)
-        return org
\ No newline at end of file
+            await cache.invalidate(CACHE_NAMESPACE, org_id)
+        return org
@@ -1,12 +1,25 @@
 import time
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import func, insert, select, update, and_
+from app.model.organization import Organization
 from app.model.otp import OTP, OTPStatusEnum
-from app.model.user import User
+from app.model.user import ThemeEnum, User
 from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 import secrets
 import uuid
+from app.config import env_int
+
+OTP_TTL_SECONDS = env_int("OTP_TTL_SECONDS", 300)
+
+
+class VerifiedLogin(NamedTuple):
+    """What token issuance needs from a verified OTP."""
+    user_id: str
+    theme: ThemeEnum
+    org_id: str
+    org_code: str
 
 
 class OtpRepository:
@@ -30,35 +43,39 @@ class OtpRepository:
         # Generate 5-digit random OTP
         otp_code = str(secrets.randbelow(90000) + 10000)  # Ensures 5 digits
         
-        # Create OTP record
-        otp_id = str(uuid.uuid4())
-        otp_record = OTP()
-        otp_record.id = otp_id
-        otp_record.user_id = user_id
-        otp_record.organization_id = organization_id
-        otp_record.phone = phone_number
-        otp_record.code = otp_code
-        otp_record.status = OTPStatusEnum.PENDING
-        otp_record.created_at = datetime.now(timezone.utc)
-        otp_record.expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)  # OTP expires in 5 minutes
-        
-        self.db.add(otp_record)
+        # Create OTP record in one INSERT ... RETURNING
+        now = datetime.now(timezone.utc)
+        otp_record = await self.db.scalar(
+            insert(OTP).values(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                organization_id=organization_id,
+                phone=phone_number,
+                code=otp_code,
+                status=OTPStatusEnum.PENDING,
+                created_at=now,
+                expires_at=now + timedelta(seconds=OTP_TTL_SECONDS),
+            ).returning(OTP)
+        )
         await self.db.commit()
-        await self.db.refresh(otp_record)
         
         return otp_record
 
     async def verify_otp(self, user_id: str, organization_id: str, phone_number: str, otp_code: str):
         """Verify the OTP and update its status to verified"""
+        # no code outlives its TTL, so bounding created_at lets Postgres
+        # skip every partition but the newest one or two
+        issued_after = datetime.now(timezone.utc) - timedelta(seconds=OTP_TTL_SECONDS)
         query = select(OTP).where(
             and_(
                 OTP.user_id == user_id,
                 OTP.organization_id == organization_id,
                 OTP.phone == phone_number,
                 OTP.code == otp_code,
-                OTP.status == OTPStatusEnum.PENDING
+                OTP.status == OTPStatusEnum.PENDING,
+                OTP.created_at >= issued_after
             )
-        ).order_by(OTP.created_at.desc())
+        ).order_by(OTP.created_at.desc()).limit(1)
         
         result = await self.db.execute(query)
         otp_record = result.scalar_one_or_none()
@@ -84,4 +101,38 @@ class OtpRepository:
         """Get OTP record by ID"""
         query = select(OTP).where(OTP.id == otp_id)
         result = await self.db.execute(query)
-        return result.scalar_one_or_none()
\ No newline at end of file
+        return result.scalar_one_or_none()
+
+    async def consume_for_login(
+        self, otp_id: str, user_id: str, organization_id: str, phone_number: str, otp_code: str
+    ) -> VerifiedLogin | None:
+        """Verify and consume the OTP issued as `otp_id` in one statement.
+
+        A conditional `UPDATE ... FROM users, organizations ... RETURNING`
+        marks the row verified only while it is pending and unexpired, and
+        returns the user and organization columns the tokens need. None
+        means the code is wrong, used, expired or unknown; expired rows are
+        left for the sweeper to mark.
+        """
+        issued_after = datetime.now(timezone.utc) - timedelta(seconds=OTP_TTL_SECONDS)
+        stmt = (
+            update(OTP)
+            .where(
+                (OTP.id == otp_id) &
+                (OTP.created_at >= issued_after) &
+                (OTP.user_id == user_id) &
+                (OTP.organization_id == organization_id) &
+                (OTP.phone == phone_number) &
+                (OTP.code == otp_code) &
+                (OTP.status == OTPStatusEnum.PENDING) &
+                (OTP.expires_at > func.now()) &
+                (User.id == OTP.user_id) &
+                (Organization.id == OTP.organization_id)
+            )
+            .values(status=OTPStatusEnum.VERIFIED, verified_at=func.now())
+            .returning(User.id, User.theme, Organization.id, Organization.org_code)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await self.db.execute(stmt)).first()
+        await self.db.commit()
+        return VerifiedLogin(*row) if row else None
@@ -0,0 +1,192 @@
+"""Pluggable OTP storage.
+
+`OTP_STORE_BACKEND` picks where one-time codes live:
+
+- `sql`: the `otp` table through `OtpRepository` (default).
+- `memory`: an in-process TTL map; only for a single worker process.
+- `redis`: a Redis-protocol server shared by every worker and node.
+
+The key-value stores key each pending code by `(user, org, phone, code)` and
+consume it with a single atomic pop (`GETDEL` in Redis), so two concurrent
+verifies of one code can never both succeed. Expired codes simply vanish
+with their TTL instead of being marked `EXPIRED`.
+"""
+import heapq
+import json
+import os
+import secrets
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import REDIS_URL
+from app.config import env_int
+from app.repository.auth import AuthRepository
+from app.repository.otp import OTP_TTL_SECONDS, OtpRepository, VerifiedLogin
+
+OTP_STORE_BACKEND = os.getenv("OTP_STORE_BACKEND", "sql")  # sql | memory | redis
+OTP_MEMORY_MAX_ENTRIES = env_int("OTP_MEMORY_MAX_ENTRIES", 100000)
+
+
+class OtpRecord(NamedTuple):
+    """Issued code as returned by the key-value stores (mirrors the OTP model fields)."""
+    id: str
+    user_id: str
+    organization_id: str
+    phone: str
+    code: str
+    expires_at: datetime
+
+
+def _new_record(user_id: str, organization_id: str, phone_number: str) -> OtpRecord:
+    return OtpRecord(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        organization_id=organization_id,
+        phone=phone_number,
+        code=str(secrets.randbelow(90000) + 10000),
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=OTP_TTL_SECONDS),
+    )
+
+
+def _key(user_id: str, organization_id: str, phone_number: str, code: str) -> str:
+    return f"otp:{organization_id}:{user_id}:{phone_number}:{code}"
+
+
+class OtpStore(ABC):
+    """Interface implemented by every OTP backend."""
+
+    @abstractmethod
+    async def issue(self, user_id: str, organization_id: str, phone_number: str):
+        """Create and persist a new code; returns an object with `id`, `code`, `expires_at`."""
+
+    @abstractmethod
+    async def verify(self, user_id: str, organization_id: str, phone_number: str, otp_code: str):
+        """Consume a matching, unexpired code; returns the record or None."""
+
+    async def verify_for_login(
+        self, auth_repo: AuthRepository, otp_id: str | None,
+        user_id: str, organization_id: str, phone_number: str, otp_code: str,
+    ) -> VerifiedLogin | None:
+        """`verify()`, then load what token issuance needs; None if the code didn't match.
+
+        `otp_id` lets a store consume the code by its key; stores without
+        such a shortcut ignore it.
+        """
+        record = await self.verify(user_id, organization_id, phone_number, otp_code)
+        if record is None:
+            return None
+        result = await auth_repo.get_user_and_org(record.user_id, record.organization_id)
+        if not result:
+            raise ValueError("User or organization not found")
+        user, org = result
+        return VerifiedLogin(user.id, user.theme, org.id, org.org_code)
+
+
+class SqlOtpStore(OtpStore):
+    def __init__(self, db: AsyncSession):
+        self.repo = OtpRepository(db)
+
+    async def issue(self, user_id: str, organization_id: str, phone_number: str):
+        return await self.repo.generate_and_store_otp(user_id, organization_id, phone_number)
+
+    async def verify(self, user_id: str, organization_id: str, phone_number: str, otp_code: str):
+        return await self.repo.verify_otp(user_id, organization_id, phone_number, otp_code)
+
+    async def verify_for_login(
+        self, auth_repo: AuthRepository, otp_id: str | None,
+        user_id: str, organization_id: str, phone_number: str, otp_code: str,
+    ) -> VerifiedLogin | None:
+        if otp_id is None:
+            return await super().verify_for_login(auth_repo, otp_id, user_id, organization_id, phone_number, otp_code)
+        # one UPDATE ... RETURNING instead of select, update, refresh and join
+        return await self.repo.consume_for_login(otp_id, user_id, organization_id, phone_number, otp_code)
+
+
+class MemoryOtpStore(OtpStore):
+    """Single-process store. Verify pops the entry without awaiting, which
+    makes verify-and-consume atomic on the event loop."""
+
+    def __init__(self, max_entries: int = OTP_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._codes: dict[str, tuple[float, OtpRecord]] = {}
+        self._expiry_heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _purge_expired(self, now: float) -> None:
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._expiry_heap)
+            entry = self._codes.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._codes[key]
+
+    async def issue(self, user_id: str, organization_id: str, phone_number: str) -> OtpRecord:
+        now = time.monotonic()
+        self._purge_expired(now)
+        if len(self._codes) >= self.max_entries:
+            raise ValueError("Too many pending OTPs, try again later")
+        record = _new_record(user_id, organization_id, phone_number)
+        key = _key(user_id, organization_id, phone_number, record.code)
+        deadline = now + OTP_TTL_SECONDS
+        self._codes[key] = (deadline, record)
+        heapq.heappush(self._expiry_heap, (deadline, key))
+        return record
+
+    async def verify(self, user_id: str, organization_id: str, phone_number: str, otp_code: str) -> OtpRecord | None:
+        entry = self._codes.pop(_key(user_id, organization_id, phone_number, otp_code), None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class RedisOtpStore(OtpStore):
+    """Cluster-wide store; needs Redis >= 6.2 for GETDEL."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def issue(self, user_id: str, organization_id: str, phone_number: str) -> OtpRecord:
+        record = _new_record(user_id, organization_id, phone_number)
+        payload = json.dumps({"id": record.id, "expires_at": record.expires_at.isoformat()})
+        await self.client.set(
+            _key(user_id, organization_id, phone_number, record.code), payload, ex=OTP_TTL_SECONDS
+        )
+        return record
+
+    async def verify(self, user_id: str, organization_id: str, phone_number: str, otp_code: str) -> OtpRecord | None:
+        raw = await self.client.getdel(_key(user_id, organization_id, phone_number, otp_code))
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        expires_at = datetime.fromisoformat(payload["expires_at"])
+        if datetime.now(timezone.utc) > expires_at:
+            return None
+        return OtpRecord(payload["id"], user_id, organization_id, phone_number, otp_code, expires_at)
+
+
+def _build_kv_store(name: str) -> OtpStore | None:
+    if name == "sql":
+        return None
+    if name == "memory":
+        return MemoryOtpStore()
+    if name == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("OTP_STORE_BACKEND=redis requires the 'redis' package")
+        return RedisOtpStore(redis_asyncio.from_url(REDIS_URL))
+    raise ValueError(f"Unknown OTP_STORE_BACKEND {name!r}, expected sql, memory or redis")
+
+
+_kv_store = _build_kv_store(OTP_STORE_BACKEND)
+
+
+def get_otp_store(db: AsyncSession) -> OtpStore:
+    """The configured store; SQL stores are bound to the request's session."""
+    if _kv_store is None:
+        return SqlOtpStore(db)
+    return _kv_store
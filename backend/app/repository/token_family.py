@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.model.token_family import RefreshTokenFamily
+
+
+class TokenFamilyRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_family(self, family_id: str, user_id: str, jti: str, expires_at: datetime) -> None:
+        await self.db.execute(
+            insert(RefreshTokenFamily).values(
+                id=family_id, user_id=user_id, current_jti=jti, expires_at=expires_at
+            )
+        )
+        await self.db.commit()
+
+    async def rotate(self, family_id: str, jti: str, new_jti: str, expires_at: datetime) -> bool:
+        """Swap `jti` for `new_jti` in one conditional UPDATE.
+
+        Succeeds only while `jti` is the family's current token and the
+        family is not revoked, so each refresh token is exchanged at most
+        once even when two workers race on it. False means reuse, a revoked
+        family or an unknown one.
+        """
+        stmt = (
+            update(RefreshTokenFamily)
+            .where(
+                (RefreshTokenFamily.id == family_id) &
+                (RefreshTokenFamily.current_jti == jti) &
+                (RefreshTokenFamily.revoked_at.is_(None))
+            )
+            .values(current_jti=new_jti, rotated_at=func.now(), expires_at=expires_at)
+            .returning(RefreshTokenFamily.id)
+        )
+        rotated = (await self.db.execute(stmt)).first() is not None
+        await self.db.commit()
+        return rotated
+
+    async def revoke(self, family_id: str) -> bool:
+        """Revoke the family; False if it was unknown or already revoked."""
+        stmt = (
+            update(RefreshTokenFamily)
+            .where((RefreshTokenFamily.id == family_id) & (RefreshTokenFamily.revoked_at.is_(None)))
+            .values(revoked_at=func.now())
+            .returning(RefreshTokenFamily.id)
+        )
+        revoked = (await self.db.execute(stmt)).first() is not None
+        await self.db.commit()
+        return revoked
+
+    async def is_revoked(self, family_id: str) -> bool:
+        revoked_at = await self.db.scalar(
+            select(RefreshTokenFamily.revoked_at).where(RefreshTokenFamily.id == family_id)
+        )
+        return revoked_at is not None
+
+    async def get_revoked_since(self, since: datetime | None) -> list[tuple[str, datetime]]:
+        """(id, revoked_at) of unexpired families revoked at or after `since` (all if None)."""
+        stmt = select(RefreshTokenFamily.id, RefreshTokenFamily.revoked_at).where(
+            RefreshTokenFamily.revoked_at.is_not(None) &
+            (RefreshTokenFamily.expires_at > func.now())
+        )
+        if since is not None:
+            stmt = stmt.where(RefreshTokenFamily.revoked_at >= since)
+        return [tuple(row) for row in (await self.db.execute(stmt)).all()]
+
+    async def delete_expired(self) -> int:
+        """Drop families whose newest refresh token has expired."""
+        result = await self.db.execute(
+            delete(RefreshTokenFamily).where(RefreshTokenFamily.expires_at <= func.now())
+        )
+        await self.db.commit()
+        return result.rowcount
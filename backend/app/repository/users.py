@@ -1,46 +1,204 @@
 
 import uuid
-from sqlalchemy import select
+from datetime import datetime
+from typing import AsyncIterator
+from sqlalchemy import Column, ColumnElement, MetaData, RowMapping, String, Table, and_, any_, bindparam, cast, func, insert, select, true, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schema.users import UserCreate, UserResponse, UserUpdate
+from app.cache import cache
+from app.schema.pagination import PageKey
+from app.schema.users import UserBulkFilter, UserCreate, UserResponse, UserUpdate
 from app.model.user import User
+
+CACHE_NAMESPACE = "user"
+
+_IMPORT_COLUMNS = ["id", "organization_id", "name", "email", "phone", "theme"]
+
+# staging table for bulk imports, created and dropped inside each chunk's
+# transaction (a rollback drops it too)
+_users_import = Table(
+    "users_import",
+    MetaData(),
+    *(Column(name, String) for name in _IMPORT_COLUMNS),
+    prefixes=["TEMPORARY"],
+)
+
+
 class UserRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all_users(self, org_id: str) -> list[UserResponse]:
-        result = await self.db.execute(select(User).where(
-        (User.status == True) & 
-        (User.organization_id == org_id)
-    )
-)
+    async def get_all_users(self, org_id: str, limit: int, after: PageKey | None = None) -> list[RowMapping]:
+        """Up to `limit` active users ordered by (created_at, id), strictly after `after`.
 
-        return list(result.scalars().all())
+        Served by ix_users_org_active_created_at_id, so deep pages cost the
+        same as the first one. Returns row mappings, not ORM instances.
+        """
+        stmt = select(User.__table__).where(
+            (User.status == True) &
+            (User.organization_id == org_id)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(User.created_at, User.id) > tuple_(*after))
+        result = await self.db.execute(stmt.order_by(User.created_at, User.id).limit(limit))
+        return list(result.mappings().all())
     
+    async def stream_users(self, org_id: str, chunk_size: int) -> AsyncIterator[list[RowMapping]]:
+        """All active users in (created_at, id) order, `chunk_size` row mappings at a time.
+
+        Reads through a server-side cursor, so only one chunk is held in
+        memory; runs inside one long read transaction on this session.
+        """
+        result = await self.db.stream(
+            select(User.__table__)
+            .where((User.status == True) & (User.organization_id == org_id))
+            .order_by(User.created_at, User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for users in result.mappings().partitions():
+            yield users
+
+    async def get_users_version(self, org_id: str) -> tuple[datetime | None, int]:
+        """(latest change over the org's users, active user count) for conditional GETs."""
+        result = await self.db.execute(
+            select(
+                func.max(func.coalesce(User.updated_at, User.created_at)),
+                func.count().filter(User.status == True),
+            ).where(User.organization_id == org_id)
+        )
+        last_change, active = result.one()
+        return last_change, active
+
     async def get_user_by_id(self, user_id: str, org_id: str) -> UserResponse | None:
+        # cached by id alone so an (entity, id) invalidation is enough;
+        # the org scope is re-checked on every hit
+        user = await cache.get_or_load(
+            CACHE_NAMESPACE, user_id, lambda: self._get_active_user(user_id), UserResponse, self.db
+        )
+        if user is None or user.organization_id != org_id:
+            return None
+        return user
+
+    async def _get_active_user(self, user_id: str) -> User | None:
+        result = await self.db.execute(select(User).where((User.id == user_id) & (User.status == True)))
+        return result.scalars().first()
+
+    async def _get_user_row(self, user_id: str, org_id: str) -> User | None:
         result =await self.db.execute(select(User).where((User.id == user_id) & (User.organization_id == org_id)& (User.status == True)))
         return result.scalars().first()
-    
-    async def delete_user_by_id(self, user_id: str, org_id: str) -> None:
-        user = await self.get_user_by_id(user_id, org_id)
+
+    async def _update_active_user(self, user_id: str, org_id: str, **values) -> User | None:
+        # one UPDATE ... RETURNING; updated_at (onupdate) comes back with the row
+        user = await self.db.scalar(
+            update(User)
+            .where((User.id == user_id) & (User.organization_id == org_id) & (User.status == True))
+            .values(**values)
+            .returning(User)
+        )
+        await self.db.commit()
         if user:
-            user.status = False
-            await self.db.commit()
+            await cache.invalidate(CACHE_NAMESPACE, user_id)
+        return user
+    
+    async def delete_user_by_id(self, user_id: str, org_id: str) -> User | None:
+        return await self._update_active_user(user_id, org_id, status=False)
 
     async def create_user(self, user_data: UserCreate) -> UserResponse:
-        new_user = User(**user_data.model_dump())
-        new_user.id = str(uuid.uuid4())
-        self.db.add(new_user)
+        values = {**user_data.model_dump(), "id": str(uuid.uuid4())}
+        new_user = await self.db.scalar(insert(User).values(**values).returning(User))
         await self.db.commit()
-        await self.db.refresh(new_user)
+        await cache.invalidate(CACHE_NAMESPACE, new_user.id)
         return new_user
     
     async def update_user(self, user_id: str, org_id: str, user_data: UserUpdate) -> UserResponse | None:
-        user = await self.get_user_by_id(user_id, org_id)
-        if user:
-            for key, value in user_data.model_dump(exclude_unset=True).items():
-                setattr(user, key, value)
-            await self.db.commit()
-            await self.db.refresh(user)
-        return user
\ No newline at end of file
+        changes = user_data.model_dump(exclude_unset=True)
+        if not changes:
+            return await self._get_user_row(user_id, org_id)
+        return await self._update_active_user(user_id, org_id, **changes)
+
+    def _ids_match(self, ids: list[str]) -> ColumnElement[bool]:
+        # one array parameter on Postgres instead of one bind per id
+        if self.db.bind.dialect.name == "postgresql":
+            return User.id == any_(bindparam("ids", ids, type_=postgresql.ARRAY(String)))
+        return User.id.in_(ids)
+
+    def bulk_filter(self, org_id: str, user_filter: UserBulkFilter | None = None) -> ColumnElement[bool]:
+        """Active users of the organization, narrowed by `user_filter`."""
+        conditions = [User.organization_id == org_id, User.status == True]
+        if user_filter is not None:
+            if user_filter.theme is not None:
+                conditions.append(User.theme == user_filter.theme)
+            if user_filter.created_before is not None:
+                conditions.append(User.created_at < user_filter.created_before)
+            if user_filter.created_after is not None:
+                conditions.append(User.created_at >= user_filter.created_after)
+        return and_(*conditions)
+
+    async def select_user_ids(self, condition: ColumnElement[bool], limit: int, after_id: str | None = None) -> list[str]:
+        """Up to `limit` ids matching `condition` in id order, strictly after `after_id`."""
+        stmt = select(User.id).where(condition)
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
+        return list((await self.db.scalars(stmt.order_by(User.id).limit(limit))).all())
+
+    async def bulk_update_users(self, ids: list[str], condition: ColumnElement[bool], **values) -> list[str]:
+        """One UPDATE ... WHERE id = ANY(:ids) RETURNING id, committed on its own.
+
+        `condition` is re-checked by the UPDATE, so rows that changed since
+        they were selected are skipped; returns the ids actually updated.
+        """
+        if not ids:
+            return []
+        result = await self.db.execute(
+            update(User)
+            .where(self._ids_match(ids) & condition)
+            .values(**values)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = list(result.scalars())
+        await self.db.commit()
+        await cache.invalidate(CACHE_NAMESPACE, *updated)
+        return updated
+
+    async def _stage_import(self, rows: list[dict]) -> None:
+        conn = await self.db.connection()
+        await conn.run_sync(_users_import.create)
+        if conn.dialect.driver == "asyncpg":
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                _users_import.name,
+                records=[tuple(row[name] for name in _IMPORT_COLUMNS) for row in rows],
+                columns=_IMPORT_COLUMNS,
+            )
+        else:
+            await conn.execute(insert(_users_import), rows)
+
+    async def bulk_insert_users(self, rows: list[dict]) -> set[str]:
+        """Insert pre-validated rows (with ids) in one transaction; returns the inserted ids.
+
+        Rows go into a temporary staging table (COPY on asyncpg), then into
+        `users` with one INSERT ... SELECT ... ON CONFLICT (email) DO NOTHING,
+        so rows whose email is already registered are skipped, not failed.
+        New ids can't be cached yet, so there is nothing to invalidate.
+        """
+        await self._stage_import(rows)
+        staged = _users_import.c
+        dialect_insert = postgresql.insert if self.db.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = (
+            dialect_insert(User)
+            .from_select(
+                _IMPORT_COLUMNS + ["status"],
+                select(
+                    staged.id, staged.organization_id, staged.name, staged.email, staged.phone,
+                    cast(staged.theme, User.__table__.c.theme.type), true(),
+                ).where(true()),  # SQLite needs a WHERE to parse ON CONFLICT after a SELECT
+            )
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User.id)
+        )
+        inserted = set((await self.db.execute(stmt)).scalars())
+        await (await self.db.connection()).run_sync(_users_import.drop)
+        await self.db.commit()
+        return inserted
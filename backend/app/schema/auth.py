@@ -16,3 +16,12 @@ class TokenResponse(BaseSchema):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
+
+
+class TokenClaims(BaseModel):
+    sub: str
+    org_id: str
+    org_code: str
+    theme: str
+    exp: int
+    fid: str | None = None  # refresh token family; absent on tokens issued before rotation
@@ -15,6 +15,8 @@ class OtpVerifyRequest(BaseSchema):
     organization_id: str
     otp_code: str
     phone_number: str
+    # from the login/send response; enables single-statement verification
+    otp_id: Optional[str] = None
 
 
 class OtpResponse(BaseSchema):
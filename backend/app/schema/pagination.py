@@ -0,0 +1,40 @@
+"""Keyset pagination over `(created_at, id)`.
+
+The cursor is opaque to clients: URL-safe base64 of the sort key of the
+last row on the previous page. Pages continue strictly after that key, so
+the cost of a page doesn't grow with how deep the client has paged.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Generic, Optional, TypeVar
+
+from app.schema.base import BaseSchema
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+T = TypeVar("T")
+
+PageKey = tuple[datetime, str]
+
+
+class Page(BaseSchema, Generic[T]):
+  items: list[T]
+  next_cursor: Optional[str] = None
+
+
+def encode_cursor(key: PageKey) -> str:
+  created_at, row_id = key
+  raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PageKey:
+  """Raises ValueError for anything `encode_cursor` didn't produce."""
+  try:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    created_at, row_id = json.loads(raw)
+    return datetime.fromisoformat(created_at), str(row_id)
+  except (TypeError, ValueError) as e:
+    raise ValueError("Invalid cursor") from e
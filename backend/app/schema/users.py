@@ -1,9 +1,10 @@
 
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, model_validator
 from datetime import datetime
 
-from app.schema.base import BaseSchema
+from app.model.user import ThemeEnum
+from app.schema.base import BaseSchema, StoredEmail
 
 
 class UserCreate(BaseSchema):
@@ -24,11 +25,58 @@ class UserResponse(BaseSchema):
   id:str
   organization_id:str
   name:str
-  email:EmailStr
+  email:StoredEmail
   phone:Optional[str]
   status:bool
   created_at:datetime
   updated_at:Optional[datetime]
   theme:Optional[str]
 
-  
\ No newline at end of file
+  
+
+class UserImportError(BaseSchema):
+  row:int
+  email:Optional[str]=None
+  errors:list[str]
+
+
+class UserImportResult(BaseSchema):
+  received:int
+  imported:int
+  failed:int
+  errors:list[UserImportError]
+  errors_truncated:bool=False
+
+
+class UserBulkFilter(BaseSchema):
+  theme:Optional[ThemeEnum]=None
+  created_before:Optional[datetime]=None
+  created_after:Optional[datetime]=None
+
+
+class UserBulkSelection(BaseSchema):
+  """Either explicit `ids` or a `filter` (an empty filter selects every active user)."""
+  ids:Optional[list[str]]=None
+  filter:Optional[UserBulkFilter]=None
+
+  @model_validator(mode="after")
+  def one_selector(self):
+    if (self.ids is None) == (self.filter is None):
+      raise ValueError("Provide exactly one of ids or filter")
+    return self
+
+
+class UserBulkChanges(BaseSchema):
+  name:Optional[str]=None
+  phone:Optional[str]=None
+  theme:Optional[ThemeEnum]=None
+
+
+class UserBulkUpdate(UserBulkSelection):
+  changes:UserBulkChanges
+
+
+class UserBulkResult(BaseSchema):
+  matched:int
+  ids:list[str]
+  not_found:list[str]=[]
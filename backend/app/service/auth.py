@@ -1,39 +1,191 @@
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app import metrics
+from app.config import env_bool, env_int
 from app.repository.auth import AuthRepository
-from app.repository.otp import OtpRepository
-from app.schema.auth import LoginRequest
+from app.repository.otp import VerifiedLogin
+from app.repository.otp_store import get_otp_store
+from app.repository.token_family import TokenFamilyRepository
+from app.schema.auth import LoginRequest, TokenClaims
 from app.schema.otp import OtpVerifyRequest
+from app.service.jwt_keys import key_ring
+from app.service.org_directory import org_directory
+from app.service.token_revocation import revocation_index
 import os
 
+logger = logging.getLogger(__name__)
+
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me-in-production")
-ALGORITHM = "HS256"
+ALGORITHM = "HS256"  # used only while JWT_KEYS_DIR is unset
+# After switching to JWT_KEYS_DIR, keep accepting HS256 tokens without a kid
+# for one refresh token lifetime so nobody is logged out by the switch.
+JWT_ACCEPT_HS256 = env_bool("JWT_ACCEPT_HS256", False)
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+VERIFIED_TOKEN_CACHE_SIZE = env_int("VERIFIED_TOKEN_CACHE_SIZE", 10000)
 
 
 def _create_token(payload: dict, expires_delta: timedelta) -> str:
     payload["exp"] = datetime.now(timezone.utc) + expires_delta
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    if not key_ring.enabled:
+        return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    key = key_ring.signing_key()
+    return jwt.encode(payload, key.private, algorithm=key.algorithm, headers={"kid": key.kid})
+
+
+def _decode_token(token: str) -> dict:
+    """Verified claims of `token`; raises JWTError otherwise."""
+    if not key_ring.enabled:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    kid = jwt.get_unverified_header(token).get("kid")
+    if kid is None:
+        if JWT_ACCEPT_HS256:
+            return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        raise JWTError("Token has no key id")
+    key = key_ring.verification_key(kid)
+    if key is None:
+        raise JWTError("Unknown or retired signing key")
+    # the key decides the algorithm, never the token's own header
+    return jwt.decode(token, key.public, algorithms=[key.algorithm])
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of access tokens that already passed signature checks.
+
+    Keyed by the SHA-256 of the token so raw tokens are not kept in memory;
+    an entry is dropped once the token's `exp` has passed.
+    """
+
+    def __init__(self, max_entries: int = VERIFIED_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, TokenClaims] = OrderedDict()
+
+    def get(self, digest: bytes) -> TokenClaims | None:
+        claims = self._entries.get(digest)
+        if claims is None:
+            self.misses += 1
+            return None
+        if claims.exp <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def put(self, digest: bytes, claims: TokenClaims) -> None:
+        self._entries[digest] = claims
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_verified_tokens = VerifiedTokenCache()
+
+
+def verify_access_token(token: str) -> TokenClaims:
+    """Return the claims of a valid access token; raises ValueError otherwise."""
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = _verified_tokens.get(digest)
+    if claims is not None:
+        return claims
+
+    try:
+        payload = _decode_token(token)
+    except JWTError:
+        raise ValueError("Invalid or expired access token")
+
+    if payload.get("type") != "access":
+        raise ValueError("Invalid token type")
+
+    try:
+        claims = TokenClaims(**payload)
+    except Exception:
+        raise ValueError("Malformed access token")
+
+    _verified_tokens.put(digest, claims)
+    return claims
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> TokenClaims:
+    """Route dependency for protected endpoints.
+
+    No database access unless the revocation filter matches the token's
+    family (see app/service/token_revocation.py).
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = verify_access_token(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # tokens issued before families existed carry no fid and expire on their own
+    if claims.fid is not None and await revocation_index.is_revoked(claims.fid):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+def _issue_tokens(claims: dict, family_id: str, jti: str) -> dict:
+    return {
+        "access_token": _create_token(
+            {**claims, "type": "access", "fid": family_id},
+            timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        ),
+        "refresh_token": _create_token(
+            {**claims, "type": "refresh", "fid": family_id, "jti": jti},
+            timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        ),
+    }
 
 
 class AuthService:
     def __init__(self, db: AsyncSession):
+        self.db = db
         self.repo = AuthRepository(db)
-        self.otp_repo = OtpRepository(db)
+        self.families = TokenFamilyRepository(db)
+        self.otp_store = get_otp_store(db)
 
     async def login(self, login_data: LoginRequest) -> dict:
-        user = await self.repo.get_user_by_email_and_org_code(
-            login_data.email, login_data.org_code
-        )
+        org = await org_directory.resolve(self.db, login_data.org_code)
+        if not org or not org.status:
+            raise ValueError("Invalid email or organization code")
+
+        user = await self.repo.get_active_user_by_org_and_email(org.id, login_data.email)
 
         if not user:
             raise ValueError("Invalid email or organization code")
 
-        otp_record = await self.otp_repo.generate_and_store_otp(
+        otp_record = await self.otp_store.issue(
             user.id, user.organization_id, user.phone
         )
+        metrics.otp_issued.inc()
 
         # TODO: send SMS via Twilio or similar
         # await send_sms(user.phone, f"Your OTP is: {otp_record.code}")
@@ -43,71 +195,76 @@ class AuthService:
             "otp_id": otp_record.id
         }
 
-    async def verify_and_generate_tokens(self, otp_verify: OtpVerifyRequest) -> dict:
-        otp_record = await self.otp_repo.verify_otp(
+    async def _verify_login(self, otp_verify: OtpVerifyRequest) -> VerifiedLogin | None:
+        return await self.otp_store.verify_for_login(
+            self.repo,
+            otp_verify.otp_id,
             otp_verify.user_id,
             otp_verify.organization_id,
             otp_verify.phone_number,
             otp_verify.otp_code
         )
 
-        if not otp_record:
-            raise ValueError("Invalid or expired OTP")
-
-        result = await self.repo.get_user_and_org_by_verified_otp(otp_record.id)
-
-        if not result:
-            raise ValueError("User or organization not found")
+    async def verify_and_generate_tokens(self, otp_verify: OtpVerifyRequest) -> dict:
+        login = await self._verify_login(otp_verify)
 
-        user, org = result
+        if not login:
+            metrics.otp_verifications.labels("rejected").inc()
+            raise ValueError("Invalid or expired OTP")
+        metrics.otp_verifications.labels("verified").inc()
 
         claims = {
-            "sub": user.id,
-            "theme": user.theme.value,
-            "org_id": org.id,
-            "org_code": org.org_code,
+            "sub": login.user_id,
+            "theme": login.theme.value,
+            "org_id": login.org_id,
+            "org_code": login.org_code,
         }
 
-        access_token = _create_token(
-            {**claims, "type": "access"},
-            timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        family_id, jti = str(uuid.uuid4()), str(uuid.uuid4())
+        await self.families.create_family(
+            family_id, login.user_id, jti,
+            datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         )
-        refresh_token = _create_token(
-            {**claims, "type": "refresh"},
-            timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        )
-
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token
-        }
+        return _issue_tokens(claims, family_id, jti)
 
     async def refresh_token(self, refresh_token: str) -> dict:
         try:
-            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = _decode_token(refresh_token)
         except JWTError:
+            metrics.tokens_refreshed.labels("rejected").inc()
             raise ValueError("Invalid or expired refresh token")
 
         if payload.get("type") != "refresh":
+            metrics.tokens_refreshed.labels("rejected").inc()
             raise ValueError("Invalid token type")
 
+        family_id, jti = payload.get("fid"), payload.get("jti")
+        if not family_id or not jti:
+            # issued before rotation existed: exchanging it could not be made one-time
+            metrics.tokens_refreshed.labels("rejected").inc()
+            raise ValueError("Refresh token is no longer accepted, log in again")
+
+        new_jti = str(uuid.uuid4())
+        rotated = await self.families.rotate(
+            family_id, jti, new_jti,
+            datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        if not rotated:
+            # Already exchanged (or revoked): whoever holds this family's
+            # tokens, one of them is not the user. End the whole family.
+            if await self.families.revoke(family_id):
+                revocation_index.add(family_id)
+                logger.warning("Refresh token reuse, revoked token family %s of user %s", family_id, payload.get("sub"))
+                metrics.tokens_refreshed.labels("reused").inc()
+            else:
+                metrics.tokens_refreshed.labels("rejected").inc()
+            raise ValueError("Invalid or expired refresh token")
+        metrics.tokens_refreshed.labels("refreshed").inc()
+
         claims = {
             "sub": payload["sub"],
             "theme": payload["theme"],
             "org_id": payload["org_id"],
             "org_code": payload["org_code"],
         }
-
-        access_token = _create_token(
-            {**claims, "type": "access"},
-            timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        )
-        new_refresh_token = _create_token(
-            {**claims, "type": "refresh"},
-            timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        )
-
-        return {
-            "access_token": access_token,
-            "refresh_token": new_refresh_token
-        }
+        return _issue_tokens(claims, family_id, new_jti)
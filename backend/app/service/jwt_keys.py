@@ -0,0 +1,265 @@
+"""Asymmetric JWT signing keys, rotated on a schedule and published as a JWKS.
+
+With `JWT_KEYS_DIR` set, tokens are signed with a private key from that
+directory instead of the shared `JWT_SECRET_KEY`. Each key is one PEM file
+named `<kid>.pem`: RSA keys sign with RS256, P-256 EC keys with ES256. Every
+token carries its key's `kid` header, and the public halves are served at
+`GET /.well-known/jwks.json` so other services can verify tokens on their
+own and cache the keys.
+
+Rotation is driven by each key's creation time, taken from its kid
+(`generate` names keys `YYYYmmddHHMMSS-<random>`, UTC) or, for files named
+otherwise, from their modification time. Every worker that reads the
+directory reaches the same decision, and copying the files to another host
+does not reset the schedule:
+
+- a new key is published in the JWKS as soon as it appears, but only signs
+  once it is `JWT_KEY_PUBLISH_SECONDS` old, giving downstream caches time to
+  fetch it first;
+- the newest key past that age signs (on first deploy, with no such key,
+  the oldest key signs right away);
+- a superseded key keeps verifying, and stays published, for
+  `JWT_KEY_OVERLAP_SECONDS` after its successor started signing, which
+  covers the longest-lived token it could have signed. After that it is
+  retired and its file can be deleted.
+
+Schedule rotation by running `python -m app.service.jwt_keys generate` from
+cron (or your secret manager's rotation hook). Workers rescan the directory
+every `JWT_KEYS_RELOAD_SECONDS` in a background thread, so file reads and
+PEM parsing stay off the event loop. A token naming a `kid` they have not
+seen costs one `stat` of the directory (at most once a second), and only a
+changed directory is rescanned right away.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+
+from app.config import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "")
+JWT_KEY_PUBLISH_SECONDS = env_int("JWT_KEY_PUBLISH_SECONDS", 3600)
+# the refresh token lifetime (7 days) plus the publish delay
+JWT_KEY_OVERLAP_SECONDS = env_int("JWT_KEY_OVERLAP_SECONDS", 7 * 24 * 3600 + 3600)
+JWT_KEYS_RELOAD_SECONDS = env_float("JWT_KEYS_RELOAD_SECONDS", 60.0)
+JWKS_MAX_AGE_SECONDS = env_int("JWKS_MAX_AGE_SECONDS", 300)
+# an unknown kid may be a key another worker already loaded; check at most this often
+_UNKNOWN_KID_CHECK_SECONDS = 1.0
+
+_ALGORITHMS = {"RS256", "ES256"}
+_KID_TIME_FORMAT = "%Y%m%d%H%M%S"
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: str
+    private: Key
+    public: Key
+    created: float
+
+
+def _algorithm(private_key) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+        return "ES256"
+    raise ValueError("expected an RSA or P-256 EC private key")
+
+
+def _created(path: Path, mtime: float) -> float:
+    # the kid's timestamp survives copies and restores that reset mtime
+    try:
+        stamp = datetime.strptime(path.stem.partition("-")[0], _KID_TIME_FORMAT)
+    except ValueError:
+        return mtime
+    return stamp.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _load_key(path: Path, created: float) -> SigningKey:
+    pem = path.read_bytes()
+    algorithm = _algorithm(serialization.load_pem_private_key(pem, password=None))
+    private = jwk.construct(pem, algorithm)
+    return SigningKey(path.stem, algorithm, private, private.public_key(), created)
+
+
+class KeyRing:
+    """The signing key and the verification keys of `JWT_KEYS_DIR`."""
+
+    def __init__(self, directory: str = JWT_KEYS_DIR):
+        self.directory = Path(directory) if directory else None
+        self._parsed: dict[tuple[str, float], SigningKey] = {}
+        self._keys: list[SigningKey] = []
+        self._signing: SigningKey | None = None
+        self._verifying: dict[str, SigningKey] = {}
+        self._jwks = b'{"keys":[]}'
+        self._etag = ""
+        self._directory_version: int | None = None
+        self._last_unknown_check = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _version(self) -> int | None:
+        # changes whenever a file is added, removed or renamed in the directory
+        try:
+            return self.directory.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _scan(self) -> tuple[dict[tuple[str, float], SigningKey], list[SigningKey], int | None]:
+        """Read and parse the directory without changing any state; safe to run in a thread."""
+        version = self._version()
+        parsed: dict[tuple[str, float], SigningKey] = {}
+        for path in sorted(self.directory.glob("*.pem")):
+            try:
+                mtime = path.stat().st_mtime
+                key = self._parsed.get((path.name, mtime)) or _load_key(path, _created(path, mtime))
+            except (OSError, ValueError):
+                logger.warning("Skipping unusable JWT key %s", path, exc_info=True)
+                continue
+            parsed[(path.name, mtime)] = key
+        keys = sorted(parsed.values(), key=lambda key: (key.created, key.kid))
+        if not keys:
+            raise RuntimeError(f"No usable JWT signing keys in {self.directory}")
+        return parsed, keys, version
+
+    def _install(self, parsed: dict[tuple[str, float], SigningKey], keys: list[SigningKey], version: int | None) -> None:
+        self._parsed = parsed
+        self._keys = keys
+        self._directory_version = version
+        self._apply_schedule(time.time())
+
+    def load(self) -> None:
+        """Rescan the directory now; parses only new or changed files."""
+        self._install(*self._scan())
+
+    def _apply_schedule(self, now: float) -> None:
+        keys = self._keys
+        ready = [index for index, key in enumerate(keys) if key.created + JWT_KEY_PUBLISH_SECONDS <= now]
+        signing_index = ready[-1] if ready else 0
+        verifying = {}
+        for index, key in enumerate(keys):
+            if index < signing_index:
+                successor_signed_at = keys[index + 1].created + JWT_KEY_PUBLISH_SECONDS
+                if successor_signed_at + JWT_KEY_OVERLAP_SECONDS <= now:
+                    continue  # retired
+            verifying[key.kid] = key
+        self._signing = keys[signing_index]
+        self._verifying = verifying
+        jwks = {"keys": [
+            {**key.public.to_dict(), "kid": key.kid, "use": "sig", "alg": key.algorithm}
+            for key in verifying.values()
+        ]}
+        self._jwks = json.dumps(jwks, separators=(",", ":")).encode()
+        self._etag = '"' + hashlib.sha256(self._jwks).hexdigest()[:32] + '"'
+
+    async def run_reloader(self) -> None:
+        """Background loop started from the app lifespan."""
+        while True:
+            await asyncio.sleep(JWT_KEYS_RELOAD_SECONDS)
+            try:
+                self._install(*await asyncio.to_thread(self._scan))
+            except Exception:
+                # keep the keys already loaded; their schedule still moves on
+                self._apply_schedule(time.time())
+                logger.warning("Could not rescan JWT keys in %s; keeping the loaded keys", self.directory, exc_info=True)
+
+    def signing_key(self) -> SigningKey:
+        return self._signing
+
+    def verification_key(self, kid: str) -> SigningKey | None:
+        key = self._verifying.get(kid)
+        if key is None and time.monotonic() - self._last_unknown_check >= _UNKNOWN_KID_CHECK_SECONDS:
+            self._last_unknown_check = time.monotonic()
+            # forged kids cost one stat; only a changed directory is rescanned
+            if self._version() != self._directory_version:
+                try:
+                    self.load()
+                except (OSError, RuntimeError):
+                    logger.warning("Could not rescan JWT keys in %s; keeping the loaded keys", self.directory, exc_info=True)
+                key = self._verifying.get(kid)
+        return key
+
+    def jwks(self) -> tuple[bytes, str]:
+        """Serialized JWKS of the published keys and its ETag."""
+        return self._jwks, self._etag
+
+    def describe(self) -> list[dict]:
+        """Every key file with its state: pending, signing, verifying or retired."""
+        keys = []
+        for key in self._keys:
+            if key is self._signing:
+                state = "signing"
+            elif key.kid not in self._verifying:
+                state = "retired"
+            elif key.created > self._signing.created:
+                state = "pending"
+            else:
+                state = "verifying"
+            keys.append({"kid": key.kid, "algorithm": key.algorithm, "created": key.created, "state": state})
+        return keys
+
+
+key_ring = KeyRing()
+
+
+def generate(directory: str, algorithm: str) -> Path:
+    """Write a new private key to `directory`; it starts signing after the publish delay."""
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported algorithm {algorithm!r}, expected one of {sorted(_ALGORITHMS)}")
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    kid = f"{datetime.now(timezone.utc).strftime(_KID_TIME_FORMAT)}-{secrets.token_hex(4)}"
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    path = target / f"{kid}.pem"
+    # private key: never world-readable, not even briefly
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(pem)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the JWT signing keys in JWT_KEYS_DIR.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("generate", help="add a new signing key (rotation)")
+    create.add_argument("--algorithm", choices=sorted(_ALGORITHMS), default="RS256")
+    create.add_argument("--dir", default=JWT_KEYS_DIR, help="defaults to $JWT_KEYS_DIR")
+    commands.add_parser("list", help="show every key and its state")
+    args = parser.parse_args()
+    if args.command == "generate":
+        if not args.dir:
+            parser.error("set JWT_KEYS_DIR or pass --dir")
+        print(generate(args.dir, args.algorithm))
+    else:
+        if not key_ring.enabled:
+            parser.error("JWT_KEYS_DIR is not set")
+        key_ring.load()
+        for key in key_ring.describe():
+            created = datetime.fromtimestamp(key["created"], timezone.utc).isoformat(timespec="seconds")
+            print(f"{key['kid']:<32} {key['algorithm']:<6} {created}  {key['state']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import env_float
+from app.database import AsyncSessionLocal
+from app.repository.organization import OrganizationRepository
+
+logger = logging.getLogger(__name__)
+
+ORG_DIRECTORY_REFRESH_SECONDS = env_float("ORG_DIRECTORY_REFRESH_SECONDS", 30.0)
+# A miss may just mean the org was created after our last refresh; refresh
+# at most this often on misses so unknown codes can't hammer the database.
+ORG_DIRECTORY_MISS_REFRESH_SECONDS = env_float("ORG_DIRECTORY_MISS_REFRESH_SECONDS", 1.0)
+# now() is the transaction start time, so a slow transaction can commit a
+# timestamp older than our watermark; re-read this much history every time.
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+class OrgEntry(NamedTuple):
+    id: str
+    status: bool
+
+
+class OrgDirectory:
+    """Per-worker `org_code -> (id, status)` snapshot of the organizations table.
+
+    Loaded in full once, then refreshed incrementally from
+    `coalesce(updated_at, created_at)`. Login resolves org codes here instead
+    of joining `organizations` on every request.
+    """
+
+    def __init__(self):
+        self._by_id: dict[str, tuple[str, bool]] = {}
+        self._by_code: dict[str, OrgEntry] = {}
+        self._watermark: datetime | None = None
+        self._loaded = False
+        self._last_miss_refresh = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._scheduled: asyncio.Task | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def lookup(self, org_code: str) -> OrgEntry | None:
+        return self._by_code.get(org_code)
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """Apply rows changed since the last refresh; returns how many were read."""
+        async with self._refresh_lock:
+            since = self._watermark - _WATERMARK_OVERLAP if self._watermark else None
+            rows = await OrganizationRepository(db).get_org_directory_rows(since)
+            touched_codes = set()
+            for org_id, org_code, status, last_change in rows:
+                previous = self._by_id.get(org_id)
+                if previous is not None:
+                    touched_codes.add(previous[0])
+                self._by_id[org_id] = (org_code, bool(status))
+                touched_codes.add(org_code)
+                if last_change is not None and (self._watermark is None or last_change > self._watermark):
+                    self._watermark = last_change
+            self._loaded = True
+            if touched_codes:
+                self._reindex(touched_codes)
+            return len(rows)
+
+    def _reindex(self, codes: set[str]) -> None:
+        # org_code is not unique in the schema; an active org wins over inactive ones
+        for code in codes:
+            self._by_code.pop(code, None)
+        for org_id, (code, status) in self._by_id.items():
+            if code in codes:
+                current = self._by_code.get(code)
+                if current is None or (status and not current.status):
+                    self._by_code[code] = OrgEntry(org_id, status)
+
+    async def resolve(self, db: AsyncSession, org_code: str) -> OrgEntry | None:
+        """Look up `org_code`, refreshing once (rate limited) on a miss."""
+        entry = self._by_code.get(org_code)
+        if entry is not None:
+            return entry
+        now = time.monotonic()
+        if not self.loaded or now - self._last_miss_refresh >= ORG_DIRECTORY_MISS_REFRESH_SECONDS:
+            self._last_miss_refresh = now
+            await self.refresh(db)
+            entry = self._by_code.get(org_code)
+        return entry
+
+    async def load(self) -> None:
+        async with AsyncSessionLocal() as db:
+            count = await self.refresh(db)
+        logger.info("Organization directory loaded with %d organizations", count)
+
+    def schedule_refresh(self) -> None:
+        """Refresh soon in the background; calls made while one is queued coalesce."""
+        if self._scheduled is None or self._scheduled.done():
+            self._scheduled = asyncio.create_task(self._refresh_in_background())
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.refresh(db)
+        except Exception:
+            logger.warning("Organization directory refresh failed", exc_info=True)
+
+    def on_invalidate(self, namespace: str, keys: tuple[str, ...]) -> None:
+        """Cache invalidation hook: pick up this worker's own org writes right away."""
+        if namespace == "org":
+            self.schedule_refresh()
+
+    async def run_refresher(self, interval: float = ORG_DIRECTORY_REFRESH_SECONDS) -> None:
+        """Background loop started from the app lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            await self._refresh_in_background()
+
+
+org_directory = OrgDirectory()
@@ -1,35 +1,57 @@
-
+from datetime import datetime
+from app.database import session_factory_for
 from app.schema.organization import OrganizationResponse,OrganizationCreate, OrganizationUpdate
 from app.repository.organization import OrganizationRepository
+from app.schema.pagination import Page, PageKey, encode_cursor
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.singleflight import SingleFlight
+
+_org_lookups = SingleFlight("organization.get_org")
 
 class OrganizationService:
     def __init__(self, db: AsyncSession):
         self.repo = OrganizationRepository(db)
 
     async def get_org(self, org_id: str) -> OrganizationResponse:
-        org = await self.repo.get_org_by_id(org_id)
+        # keyed by engine too: a primary-pinned caller must not share a replica read
+        bind = self.repo.db.bind
+        # the flight takes a connection of its own: hand back any this
+        # request holds so waiting never holds two
+        await self.repo.db.close()
+        return await _org_lookups.do((id(bind), org_id), lambda: self._load_org(bind, org_id))
+
+    @staticmethod
+    async def _load_org(bind, org_id: str) -> OrganizationResponse:
+        # the flight outlives whichever request started it, so it gets its own session
+        async with session_factory_for(bind)() as db:
+            org = await OrganizationRepository(db).get_org_by_id(org_id)
         if not org:
             raise ValueError("Organization not found")
         return OrganizationResponse.model_validate(org)
     
+    async def get_orgs_version(self) -> tuple[datetime | None, int]:
+        return await self.repo.get_orgs_version()
+
     async def create_org(self, org_data: OrganizationCreate) -> OrganizationResponse:
         org = await self.repo.create_org(org_data)
         return OrganizationResponse.model_validate(org)
     
-    async def get_all_orgs(self) -> list[OrganizationResponse]:
-        orgs = await self.repo.get_all_orgs()
-        return [OrganizationResponse.model_validate(org) for org in orgs]
+    async def get_all_orgs(self, limit: int, after: PageKey | None = None) -> Page[OrganizationResponse]:
+        # one extra row tells whether another page exists
+        orgs = await self.repo.get_all_orgs(limit + 1, after)
+        page = orgs[:limit]
+        next_cursor = encode_cursor((page[-1]["created_at"], page[-1]["id"])) if len(orgs) > limit else None
+        # items are validated once here; construct() keeps the page from re-checking them
+        return Page[OrganizationResponse].model_construct(
+            items=OrganizationResponse.from_rows(page), next_cursor=next_cursor
+        )
     
     async def delete_org(self,  org_id: str) -> None:
-        org = await self.repo.get_org_by_id(org_id)
-        if not org:
+        if not await self.repo.delete_org(org_id):
             raise ValueError("Organization not found")
-        await self.repo.delete_org(org_id)
     
     async def update_org(self, org_id: str, org_data: OrganizationUpdate) -> OrganizationResponse:
-        org = await self.repo.get_org_by_id(org_id)
-        if not org:
-            raise ValueError("Organization not found")
         updated_org = await self.repo.update_org(org_id, org_data)
+        if not updated_org:
+            raise ValueError("Organization not found")
         return OrganizationResponse.model_validate(updated_org)
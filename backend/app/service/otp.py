@@ -1,19 +1,22 @@
 from app.schema.otp import OtpRequest, OtpVerifyRequest, OtpResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from app import metrics
 from app.repository.otp import OtpRepository
+from app.repository.otp_store import get_otp_store
 
 
 class OtpService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.repo = OtpRepository(db)
+        self.store = get_otp_store(db)
 
     async def send_otp(self, otp_request: OtpRequest):
         """
         Send OTP by:
         1. Validating organization and user
         2. Generating 5-digit random OTP
-        3. Storing in database
+        3. Storing it in the configured OTP store
         """
         # Step 1: Validate if organization exists and user belongs to it
         is_valid = await self.repo.validate_organization_and_user(
@@ -25,11 +28,12 @@ class OtpService:
             raise ValueError("Invalid user or organization")
         
         # Step 2 & 3: Generate and store OTP
-        otp_record = await self.repo.generate_and_store_otp(
+        otp_record = await self.store.issue(
             otp_request.user_id,
             otp_request.organization_id,
             otp_request.phone_number
         )
+        metrics.otp_issued.inc()
         
         # TODO: Send OTP to phone number (integrate SMS service like Twilio)
         # await send_sms(otp_request.phone_number, f"Your OTP is: {otp_record.code}")
@@ -43,7 +47,7 @@ class OtpService:
         """
         Verify OTP and update status to verified
         """
-        otp_record = await self.repo.verify_otp(
+        otp_record = await self.store.verify(
             otp_verify.user_id,
             otp_verify.organization_id,
             otp_verify.phone_number,
@@ -51,7 +55,9 @@ class OtpService:
         )
         
         if not otp_record:
+            metrics.otp_verifications.labels("rejected").inc()
             raise ValueError("Invalid or expired OTP")
+        metrics.otp_verifications.labels("verified").inc()
         
         return {
             "verified": True,
@@ -0,0 +1,160 @@
+"""Range partitions of the `otp` table.
+
+`otp` is partitioned by `created_at` into daily (or, with
+`OTP_PARTITION_INTERVAL=week`, weekly) partitions named `otp_pYYYYMMDD`
+after their UTC lower bound. The OTP sweeper calls `maintain()` to keep
+`OTP_PARTITION_PREMAKE` future periods created and to retire partitions that
+lie wholly before the retention cutoff: they are detached and dropped (after
+copying their rows into `otp_archive` in archive mode), so retention never
+deletes rows from the live table.
+
+New partitions start at the upper bound of the newest existing one, so the
+interval can be changed at any time without overlapping ranges.
+"""
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config import env_int
+from app.model.otp import OTPArchive
+
+logger = logging.getLogger(__name__)
+
+OTP_PARTITION_INTERVAL = os.getenv("OTP_PARTITION_INTERVAL", "day")  # day | week
+OTP_PARTITION_PREMAKE = env_int("OTP_PARTITION_PREMAKE", 7)  # future periods kept ready
+
+_PARTITION_PREFIX = "otp_p"
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+_ARCHIVE_COLUMNS = ", ".join(column.name for column in OTPArchive.__table__.columns)
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: datetime
+    upper: datetime
+    detach_pending: bool
+
+
+class MaintenanceResult(NamedTuple):
+    created: int
+    dropped: int
+
+
+def _period_length() -> timedelta:
+    if OTP_PARTITION_INTERVAL not in ("day", "week"):
+        raise ValueError(f"Unknown OTP_PARTITION_INTERVAL {OTP_PARTITION_INTERVAL!r}, expected day or week")
+    return timedelta(days=7 if OTP_PARTITION_INTERVAL == "week" else 1)
+
+
+def _period_start(moment: datetime) -> datetime:
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if OTP_PARTITION_INTERVAL == "week":
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def _partition_name(lower: datetime) -> str:
+    return f"{_PARTITION_PREFIX}{lower:%Y%m%d}"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """Whether `otp` is the partitioned table (migration b7c4e2a9d5f1 has run)."""
+    return bool(await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('otp'))"
+    )))
+
+
+async def list_partitions(conn: AsyncConnection) -> list[Partition]:
+    """Attached (or half-detached) range partitions of `otp`, oldest first."""
+    result = await conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), i.inhdetachpending "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'otp'::regclass"
+    ))
+    partitions = []
+    for name, bound, detach_pending in result:
+        match = _BOUND_RE.search(bound or "")
+        if match is None:
+            continue  # DEFAULT or MINVALUE/MAXVALUE partitions are not managed here
+        lower, upper = (datetime.fromisoformat(value).astimezone(timezone.utc) for value in match.groups())
+        partitions.append(Partition(name, lower, upper, detach_pending))
+    return sorted(partitions, key=lambda partition: partition.lower)
+
+
+async def _detached_leftovers(conn: AsyncConnection) -> list[str]:
+    # partitions detached by an interrupted earlier run but never dropped
+    result = await conn.execute(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relname LIKE :pattern AND relkind = 'r' AND NOT relispartition "
+        "AND relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = 'otp'::regclass)"
+    ), {"pattern": f"{_PARTITION_PREFIX}%"})
+    return [name for name in result.scalars() if re.fullmatch(rf"{_PARTITION_PREFIX}\d{{8}}", name)]
+
+
+async def ensure_partitions(conn: AsyncConnection, partitions: list[Partition], now: datetime) -> int:
+    """Create partitions up to `OTP_PARTITION_PREMAKE` periods ahead of `now`."""
+    length = _period_length()
+    horizon = _period_start(now) + length * (OTP_PARTITION_PREMAKE + 1)
+    start = partitions[-1].upper if partitions else _period_start(now)
+    created = 0
+    while start < horizon:
+        # realigns to period boundaries after the interval setting changed
+        end = _period_start(start) + length
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(start)} PARTITION OF otp "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        created += 1
+        start = end
+    return created
+
+
+async def _drop(conn: AsyncConnection, name: str, archive: bool) -> None:
+    if archive:
+        await conn.execute(text(
+            f"INSERT INTO otp_archive ({_ARCHIVE_COLUMNS}) SELECT {_ARCHIVE_COLUMNS} FROM {name} "
+            "ON CONFLICT (id) DO NOTHING"
+        ))
+    await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def retire_partitions(
+    conn: AsyncConnection, partitions: list[Partition], cutoff: datetime, archive: bool, concurrently: bool
+) -> int:
+    """Detach and drop partitions whose whole range is older than `cutoff`.
+
+    `concurrently` uses `DETACH PARTITION ... CONCURRENTLY` (Postgres 14+),
+    which doesn't block inserts and lookups on `otp` but must run outside a
+    transaction block, i.e. on an AUTOCOMMIT connection.
+    """
+    dropped = 0
+    for name in await _detached_leftovers(conn):
+        await _drop(conn, name, archive)
+        dropped += 1
+    for partition in partitions:
+        if partition.upper > cutoff:
+            break
+        if partition.detach_pending:
+            await conn.execute(text(f"ALTER TABLE otp DETACH PARTITION {partition.name} FINALIZE"))
+        else:
+            mode = " CONCURRENTLY" if concurrently else ""
+            await conn.execute(text(f"ALTER TABLE otp DETACH PARTITION {partition.name}{mode}"))
+        await _drop(conn, partition.name, archive)
+        dropped += 1
+    return dropped
+
+
+async def maintain(conn: AsyncConnection, cutoff: datetime, archive: bool, concurrently: bool) -> MaintenanceResult:
+    """Create upcoming partitions and retire expired ones; a no-op before the partitioning migration."""
+    if not await is_partitioned(conn):
+        return MaintenanceResult(0, 0)
+    now = datetime.now(timezone.utc)
+    partitions = await list_partitions(conn)
+    created = await ensure_partitions(conn, partitions, now)
+    dropped = await retire_partitions(conn, partitions, cutoff, archive, concurrently)
+    if created or dropped:
+        logger.info("OTP partitions: created %d, dropped %d", created, dropped)
+    return MaintenanceResult(created, dropped)
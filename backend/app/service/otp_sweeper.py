@@ -0,0 +1,207 @@
+"""Background expiry and retention for the `otp` table.
+
+Runs from the app lifespan in every worker, but a Postgres advisory lock
+lets only one worker sweep at a time. Each run:
+
+1. marks `PENDING` rows past `expires_at` as `EXPIRED`, in short
+   transactions of at most `OTP_SWEEP_BATCH_SIZE` rows picked with
+   `FOR UPDATE SKIP LOCKED`, so a verify holding a row lock is never blocked
+   and never blocks the sweeper;
+2. maintains the `created_at` range partitions (`app/service/otp_partitions.py`):
+   creates upcoming ones and detaches and drops (or, with
+   `OTP_RETENTION_MODE=archive`, first copies into `otp_archive`) those older
+   than `OTP_RETENTION_DAYS`.
+
+Inserts into `otp` fail once no partition covers the current time, so
+future partitions are created even where the sweep itself does not apply
+(`OTP_SWEEPER_ENABLED=false`, or another OTP store): `run_forever()` then
+only runs `create_partitions()`.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app import metrics
+from app.config import env_bool, env_float, env_int
+from app.database import DB_PGBOUNCER_MODE, engine
+from app.model.otp import OTP, OTPStatusEnum
+from app.repository.otp_store import OTP_STORE_BACKEND
+from app.service import otp_partitions
+
+logger = logging.getLogger(__name__)
+
+OTP_SWEEPER_ENABLED = env_bool("OTP_SWEEPER_ENABLED", True)
+OTP_SWEEP_INTERVAL_SECONDS = env_float("OTP_SWEEP_INTERVAL_SECONDS", 60.0)
+OTP_SWEEP_BATCH_SIZE = env_int("OTP_SWEEP_BATCH_SIZE", 1000)
+OTP_SWEEP_MAX_BATCHES = env_int("OTP_SWEEP_MAX_BATCHES", 50)  # per run
+OTP_RETENTION_DAYS = env_int("OTP_RETENTION_DAYS", 30)
+OTP_RETENTION_MODE = os.getenv("OTP_RETENTION_MODE", "delete")  # delete | archive
+# arbitrary key shared by all workers ("otp_sw" in ASCII)
+OTP_SWEEP_LOCK_KEY = 0x6F74705F7377
+
+
+class SweeperStats:
+    def __init__(self):
+        self.runs = 0
+        self.skipped_locked = 0
+        self.failures = 0
+        self.expired_total = 0
+        self.partitions_created_total = 0
+        self.partitions_dropped_total = 0
+        self.last_run_at: datetime | None = None
+        self.last_expired = 0
+        self.last_partitions_created = 0
+        self.last_partitions_dropped = 0
+        self.last_duration_ms = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "enabled": OTP_SWEEPER_ENABLED,
+            "retention_mode": OTP_RETENTION_MODE,
+            "retention_days": OTP_RETENTION_DAYS,
+            "runs": self.runs,
+            "skipped_locked": self.skipped_locked,
+            "failures": self.failures,
+            "partition_interval": otp_partitions.OTP_PARTITION_INTERVAL,
+            "expired_total": self.expired_total,
+            "partitions_created_total": self.partitions_created_total,
+            "partitions_dropped_total": self.partitions_dropped_total,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_expired": self.last_expired,
+            "last_partitions_created": self.last_partitions_created,
+            "last_partitions_dropped": self.last_partitions_dropped,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+class OtpSweeper:
+    def __init__(self):
+        self.stats = SweeperStats()
+
+    @staticmethod
+    def _expire_batch():
+        stale = (
+            select(OTP.id, OTP.created_at)
+            .where((OTP.status == OTPStatusEnum.PENDING) & (OTP.expires_at < func.now()))
+            .limit(OTP_SWEEP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        # matching on the partition key too lets the UPDATE go straight to
+        # each row's partition instead of probing every partition per id
+        return (
+            update(OTP)
+            .where(tuple_(OTP.id, OTP.created_at).in_(stale))
+            .values(status=OTPStatusEnum.EXPIRED)
+        )
+
+    async def _expire(self, conn: AsyncConnection) -> int | None:
+        """Run batches until one comes back short; None means another worker holds the lock."""
+        total = 0
+        for _ in range(OTP_SWEEP_MAX_BATCHES):
+            if DB_PGBOUNCER_MODE:
+                # session locks don't survive transaction pooling; lock per batch instead
+                if not await conn.scalar(select(func.pg_try_advisory_xact_lock(OTP_SWEEP_LOCK_KEY))):
+                    await conn.rollback()
+                    return None if total == 0 else total
+            result = await conn.execute(self._expire_batch())
+            await conn.commit()
+            total += result.rowcount
+            if result.rowcount < OTP_SWEEP_BATCH_SIZE:
+                break
+        return total
+
+    async def _maintain_partitions(self, conn: AsyncConnection, cutoff: datetime):
+        archive = OTP_RETENTION_MODE == "archive"
+        if not DB_PGBOUNCER_MODE:
+            # the connection is in AUTOCOMMIT, so partitions can be detached concurrently
+            return await otp_partitions.maintain(conn, cutoff, archive, concurrently=True)
+        if not await conn.scalar(select(func.pg_try_advisory_xact_lock(OTP_SWEEP_LOCK_KEY))):
+            await conn.rollback()
+            return None
+        result = await otp_partitions.maintain(conn, cutoff, archive, concurrently=False)
+        await conn.commit()
+        return result
+
+    async def run_once(self) -> dict:
+        """One sweep; returns this run's counts."""
+        start = time.perf_counter()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=OTP_RETENTION_DAYS)
+        async with engine.connect() as conn:
+            if not DB_PGBOUNCER_MODE:
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                if not await conn.scalar(select(func.pg_try_advisory_lock(OTP_SWEEP_LOCK_KEY))):
+                    self.stats.skipped_locked += 1
+                    return {"skipped": True}
+            try:
+                expired = await self._expire(conn)
+                partitions = await self._maintain_partitions(conn, cutoff)
+            finally:
+                if not DB_PGBOUNCER_MODE:
+                    await conn.execute(select(func.pg_advisory_unlock(OTP_SWEEP_LOCK_KEY)))
+
+        if expired is None and partitions is None:
+            self.stats.skipped_locked += 1
+            return {"skipped": True}
+        partitions = partitions or otp_partitions.MaintenanceResult(0, 0)
+        stats = self.stats
+        stats.runs += 1
+        stats.last_run_at = datetime.now(timezone.utc)
+        stats.last_expired = expired or 0
+        stats.last_partitions_created = partitions.created
+        stats.last_partitions_dropped = partitions.dropped
+        stats.expired_total += stats.last_expired
+        metrics.otp_expired.inc(stats.last_expired)
+        stats.partitions_created_total += partitions.created
+        stats.partitions_dropped_total += partitions.dropped
+        stats.last_duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        if stats.last_expired:
+            logger.info("OTP sweep expired %d rows", stats.last_expired)
+        return {
+            "expired": stats.last_expired,
+            "partitions_created": partitions.created,
+            "partitions_dropped": partitions.dropped,
+        }
+
+    async def create_partitions(self) -> int:
+        """Create upcoming partitions only, without expiring rows or retiring partitions."""
+        async with engine.begin() as conn:
+            if not await otp_partitions.is_partitioned(conn):
+                return 0
+            if not await conn.scalar(select(func.pg_try_advisory_xact_lock(OTP_SWEEP_LOCK_KEY))):
+                return 0
+            partitions = await otp_partitions.list_partitions(conn)
+            created = await otp_partitions.ensure_partitions(conn, partitions, datetime.now(timezone.utc))
+        if created:
+            logger.info("OTP partitions: created %d", created)
+        self.stats.partitions_created_total += created
+        return created
+
+    async def run_forever(self, interval: float = OTP_SWEEP_INTERVAL_SECONDS, sweep: bool = True) -> None:
+        """Sweep every `interval`; with `sweep` False only keep partitions created."""
+        # run right away: partitions for today may be missing after a long outage
+        while True:
+            try:
+                if sweep:
+                    await self.run_once()
+                else:
+                    await self.create_partitions()
+            except Exception:
+                self.stats.failures += 1
+                logger.warning("OTP sweep failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+otp_sweeper = OtpSweeper()
+
+
+def sweeper_applies() -> bool:
+    """Only the SQL OTP store on Postgres has rows to sweep."""
+    return OTP_SWEEPER_ENABLED and OTP_STORE_BACKEND == "sql" and engine.dialect.name == "postgresql"
+
+
+def partitions_apply() -> bool:
+    """The partitioned `otp` table only exists on Postgres; checked again per run."""
+    return engine.dialect.name == "postgresql"
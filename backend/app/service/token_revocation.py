@@ -0,0 +1,188 @@
+"""Per-worker index of revoked refresh token families.
+
+Every token issued from one login carries the login's family id (`fid`).
+A family is revoked when one of its refresh tokens is presented a second
+time (see `AuthService.refresh_token`), which cuts off the access tokens of
+that family as well, not only its refresh tokens.
+
+Checking that on every authenticated request would cost a query each, so
+`get_current_user` asks this index first: a Bloom filter of the revoked
+family ids, with the `refresh_token_families` table as the exact store
+behind it. A miss in the filter is definite (not revoked, no query); a hit
+is confirmed against the table, which settles the filter's false
+positives (`REVOCATION_FILTER_ERROR_RATE`). Refresh itself needs no
+separate check: its one-time-use UPDATE refuses revoked families.
+
+The filter is loaded at startup, picks up other workers' revocations every
+`REVOCATION_REFRESH_SECONDS`, and is rebuilt from scratch every
+`REVOCATION_REBUILD_SECONDS` so families past their expiry drop out (a
+Bloom filter cannot delete). `TOKEN_REVOCATION_CHECK` picks `bloom`
+(default), `exact` (a query per request) or `off`.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import env_float, env_int
+from app.database import AsyncSessionLocal
+from app.repository.token_family import TokenFamilyRepository
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_CHECK = os.getenv("TOKEN_REVOCATION_CHECK", "bloom")  # bloom | exact | off
+if TOKEN_REVOCATION_CHECK not in ("bloom", "exact", "off"):
+    # a typo must not quietly turn into one mode or another
+    raise ValueError(f"Unknown TOKEN_REVOCATION_CHECK {TOKEN_REVOCATION_CHECK!r}, expected bloom, exact or off")
+REVOCATION_FILTER_CAPACITY = env_int("REVOCATION_FILTER_CAPACITY", 100000)
+REVOCATION_FILTER_ERROR_RATE = env_float("REVOCATION_FILTER_ERROR_RATE", 0.001)
+REVOCATION_REFRESH_SECONDS = env_float("REVOCATION_REFRESH_SECONDS", 5.0)
+REVOCATION_REBUILD_SECONDS = env_float("REVOCATION_REBUILD_SECONDS", 3600.0)
+# now() is the transaction start time, so a slow transaction can commit a
+# revoked_at older than our watermark; re-read this much history every time.
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (Kirsch-Mitzenmacher double hashing)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        position = int.from_bytes(digest[:8], "little") % self.size
+        # never 0 (every probe on one bit) whatever the size's parity
+        step = int.from_bytes(digest[8:], "little") % (self.size - 1) + 1
+        for _ in range(self.hashes):
+            yield position
+            position = (position + step) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        # most lookups are misses and stop at the first clear bit
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationIndex:
+    def __init__(self):
+        self._filter = self._new_filter(0)
+        self._watermark: datetime | None = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        # ids revoked by this worker while a rebuild is reading the table
+        self._added_during_rebuild: set[str] | None = None
+        self.filter_skips = 0
+        self.exact_checks = 0
+
+    @staticmethod
+    def _new_filter(revoked: int) -> BloomFilter:
+        if revoked > REVOCATION_FILTER_CAPACITY:
+            logger.warning(
+                "%d revoked token families exceed REVOCATION_FILTER_CAPACITY=%d; sizing the filter up",
+                revoked, REVOCATION_FILTER_CAPACITY,
+            )
+        return BloomFilter(max(REVOCATION_FILTER_CAPACITY, 2 * revoked), REVOCATION_FILTER_ERROR_RATE)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def add(self, family_id: str) -> None:
+        """Record a revocation made by this worker right away."""
+        self._filter.add(family_id)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.add(family_id)
+
+    def _apply(self, rows: list[tuple[str, datetime]], target: BloomFilter) -> None:
+        for family_id, revoked_at in rows:
+            target.add(family_id)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """Add families revoked since the last refresh; returns how many were read."""
+        async with self._lock:
+            since = self._watermark - _WATERMARK_OVERLAP if self._watermark else None
+            rows = await TokenFamilyRepository(db).get_revoked_since(since)
+            self._apply(rows, self._filter)
+            self._loaded = True
+            return len(rows)
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Replace the filter with one holding only unexpired revoked families."""
+        async with self._lock:
+            self._added_during_rebuild = set()
+            try:
+                rows = await TokenFamilyRepository(db).get_revoked_since(None)
+                rebuilt = self._new_filter(len(rows))
+                self._watermark = None
+                self._apply(rows, rebuilt)
+                for family_id in self._added_during_rebuild:
+                    rebuilt.add(family_id)
+                self._filter = rebuilt
+            finally:
+                self._added_during_rebuild = None
+            self._loaded = True
+            return len(rows)
+
+    async def is_revoked(self, family_id: str) -> bool:
+        if TOKEN_REVOCATION_CHECK == "off":
+            return False
+        if TOKEN_REVOCATION_CHECK == "bloom" and self._loaded and family_id not in self._filter:
+            self.filter_skips += 1
+            return False
+        self.exact_checks += 1
+        async with AsyncSessionLocal() as db:
+            return await TokenFamilyRepository(db).is_revoked(family_id)
+
+    async def load(self) -> None:
+        async with AsyncSessionLocal() as db:
+            count = await self.rebuild(db)
+        logger.info("Token revocation filter loaded with %d revoked families", count)
+
+    async def run_refresher(self) -> None:
+        """Background loop started from the app lifespan."""
+        next_rebuild = time.monotonic() + REVOCATION_REBUILD_SECONDS
+        while True:
+            await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    if time.monotonic() >= next_rebuild:
+                        next_rebuild = time.monotonic() + REVOCATION_REBUILD_SECONDS
+                        await TokenFamilyRepository(db).delete_expired()
+                        await self.rebuild(db)
+                    else:
+                        await self.refresh(db)
+            except Exception:
+                logger.warning("Token revocation filter refresh failed", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "mode": TOKEN_REVOCATION_CHECK,
+            "loaded": self._loaded,
+            "filter_adds": self._filter.count,
+            "filter_capacity": self._filter.capacity,
+            "filter_bytes": len(self._filter._bits),
+            "filter_hashes": self._filter.hashes,
+            "filter_skips": self.filter_skips,
+            "exact_checks": self.exact_checks,
+        }
+
+
+revocation_index = RevocationIndex()
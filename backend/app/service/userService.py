@@ -1,6 +1,18 @@
+from datetime import datetime
+from typing import AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import env_int
+from app.database import session_factory_for
 from app.repository.users import UserRepository
-from app.schema.users import UserCreate, UserResponse,UserUpdate
+from app.schema.pagination import Page, PageKey, encode_cursor
+from app.schema.users import UserBulkResult, UserBulkSelection, UserBulkUpdate, UserCreate, UserResponse,UserUpdate
+from app.singleflight import SingleFlight
+
+_user_lists = SingleFlight("users.get_all_users")
+
+EXPORT_CHUNK_SIZE = 1000
+# rows per UPDATE (and transaction) in bulk updates, bounding how long row locks are held
+USER_BULK_CHUNK_SIZE = env_int("USER_BULK_CHUNK_SIZE", 1000)
 
 
 class UserService:
@@ -8,10 +20,35 @@ class UserService:
         self.db = db
         self.repo = UserRepository(db)
 
-    async def get_all_users(self, org_id: str) -> list[UserResponse]:
-        users = await self.repo.get_all_users(org_id)
-        return [UserResponse.model_validate(user) for user in users]
+    async def get_all_users(self, org_id: str, limit: int, after: PageKey | None = None) -> Page[UserResponse]:
+        # keyed by engine too: a primary-pinned caller must not share a replica read
+        bind = self.db.bind
+        # the flight takes a connection of its own: hand back the one this
+        # request holds (for the version query) so waiting never holds two
+        await self.db.close()
+        return await _user_lists.do(
+            (id(bind), org_id, limit, after), lambda: self._load_all_users(bind, org_id, limit, after)
+        )
+
+    @staticmethod
+    async def _load_all_users(bind, org_id: str, limit: int, after: PageKey | None) -> Page[UserResponse]:
+        # the flight outlives whichever request started it, so it gets its own session
+        async with session_factory_for(bind)() as db:
+            # one extra row tells whether another page exists
+            users = await UserRepository(db).get_all_users(org_id, limit + 1, after)
+        page = users[:limit]
+        next_cursor = encode_cursor((page[-1]["created_at"], page[-1]["id"])) if len(users) > limit else None
+        # items are validated once here; construct() keeps the page from re-checking them
+        return Page[UserResponse].model_construct(items=UserResponse.from_rows(page), next_cursor=next_cursor)
     
+    async def export_users(self, org_id: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """NDJSON, one `UserResponse` per line, emitted one chunk at a time."""
+        async for users in self.repo.stream_users(org_id, chunk_size):
+            yield b"".join(user.model_dump_json().encode() + b"\n" for user in UserResponse.from_rows(users))
+
+    async def get_users_version(self, org_id: str) -> tuple[datetime | None, int]:
+        return await self.repo.get_users_version(org_id)
+
     async def get_user_by_id(self, user_id: str, org_id: str) -> UserResponse:
         user = await self.repo.get_user_by_id(user_id, org_id)
         return UserResponse.model_validate(user)
@@ -26,4 +63,38 @@ class UserService:
     
     async def update_user(self, user_id: str, org_id: str, user_data: UserUpdate) -> UserResponse:
         user = await self.repo.update_user(user_id, org_id, user_data)
-        return UserResponse.model_validate(user)
\ No newline at end of file
+        return UserResponse.model_validate(user)
+
+    async def bulk_update_users(self, org_id: str, request: UserBulkUpdate) -> UserBulkResult:
+        changes = request.changes.model_dump(exclude_none=True)
+        if not changes:
+            raise ValueError("No changes given")
+        return await self._bulk_update(org_id, request, **changes)
+
+    async def bulk_delete_users(self, org_id: str, selection: UserBulkSelection) -> UserBulkResult:
+        return await self._bulk_update(org_id, selection, status=False)
+
+    async def _bulk_update(self, org_id: str, selection: UserBulkSelection, **values) -> UserBulkResult:
+        """Apply `values` to the selected active users, `USER_BULK_CHUNK_SIZE` rows per transaction.
+
+        A failure part-way leaves earlier chunks committed; the cache is
+        invalidated chunk by chunk, so it never serves a committed change stale.
+        """
+        condition = self.repo.bulk_filter(org_id, selection.filter)
+        updated: list[str] = []
+        if selection.ids is not None:
+            ids = list(dict.fromkeys(selection.ids))
+            for start in range(0, len(ids), USER_BULK_CHUNK_SIZE):
+                updated += await self.repo.bulk_update_users(ids[start:start + USER_BULK_CHUNK_SIZE], condition, **values)
+            matched = set(updated)
+            return UserBulkResult(matched=len(updated), ids=updated, not_found=[id for id in ids if id not in matched])
+        # keyset over id, so each chunk starts where the last one ended even
+        # when the update doesn't take rows out of the filter
+        after_id = None
+        while True:
+            ids = await self.repo.select_user_ids(condition, USER_BULK_CHUNK_SIZE, after_id)
+            updated += await self.repo.bulk_update_users(ids, condition, **values)
+            if len(ids) < USER_BULK_CHUNK_SIZE:
+                break
+            after_id = ids[-1]
+        return UserBulkResult(matched=len(updated), ids=updated)
@@ -0,0 +1,183 @@
+"""Bulk user import from a streamed CSV or NDJSON request body.
+
+The body is parsed incrementally, validated against `UserCreate` and
+loaded `USER_IMPORT_CHUNK_SIZE` rows at a time (COPY into a staging table,
+then one INSERT ... ON CONFLICT DO NOTHING into `users`; see
+`UserRepository.bulk_insert_users`). Each chunk commits on its own, so a bad
+row never rolls back good ones; every rejected row is reported with its
+1-based position among the data rows.
+
+CSV needs a header row naming the columns (`name`, `email`, `phone`,
+`theme`; `organization_id` optional). NDJSON takes one JSON object per line
+with the same keys. Rows are imported into the organization in the URL; a
+row naming a different `organization_id` is rejected.
+"""
+import codecs
+import csv
+import json
+import uuid
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import env_int
+from app.model.user import ThemeEnum
+from app.repository.users import UserRepository
+from app.schema.users import UserCreate, UserImportError, UserImportResult
+
+USER_IMPORT_CHUNK_SIZE = env_int("USER_IMPORT_CHUNK_SIZE", 5000)
+USER_IMPORT_MAX_ERRORS = env_int("USER_IMPORT_MAX_ERRORS", 10000)
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+_THEMES = {theme.value for theme in ThemeEnum}
+
+# (row number, parsed fields or None, parse error or None)
+ParsedRow = tuple[int, dict | None, str | None]
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in body:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def _csv_rows(body: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    header: list[str] | None = None
+    record: list[str] = []
+    quotes = 0
+    row_no = 0
+    async for line in _lines(body):
+        # a quoted field may contain newlines: keep reading until quotes balance
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = "\n".join(record), [], 0
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            row_no += 1
+            yield row_no, None, f"Malformed CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_no += 1
+        if len(values) != len(header):
+            yield row_no, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_no, {name: (value if value != "" else None) for name, value in zip(header, values)}, None
+    if record:
+        yield row_no + 1, None, "Unterminated quoted field"
+
+
+async def _ndjson_rows(body: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    row_no = 0
+    async for line in _lines(body):
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_no, None, f"Malformed JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_no, None, "Expected a JSON object"
+            continue
+        yield row_no, data, None
+
+
+def parse_rows(body: AsyncIterator[bytes], content_type: str) -> AsyncIterator[ParsedRow]:
+    """Parser for the request's media type; ValueError if unsupported."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return _csv_rows(body)
+    if media_type in NDJSON_TYPES:
+        return _ndjson_rows(body)
+    raise ValueError(f"Unsupported content type {media_type!r}, send text/csv or application/x-ndjson")
+
+
+class UserImporter:
+    def __init__(self, db: AsyncSession, org_id: str):
+        self.repo = UserRepository(db)
+        self.org_id = org_id
+        self.result = UserImportResult(received=0, imported=0, failed=0, errors=[])
+        self._seen_emails: dict[str, int] = {}
+        self._chunk: list[tuple[int, dict]] = []
+
+    def _reject(self, row_no: int, email: str | None, *errors: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < USER_IMPORT_MAX_ERRORS:
+            self.result.errors.append(UserImportError(row=row_no, email=email, errors=list(errors)))
+        else:
+            self.result.errors_truncated = True
+
+    def _validate(self, row_no: int, data: dict) -> dict | None:
+        org_id = data.get("organization_id") or self.org_id
+        if org_id != self.org_id:
+            self._reject(row_no, data.get("email"), "organization_id does not match the import organization")
+            return None
+        try:
+            user = UserCreate.model_validate({**data, "organization_id": org_id})
+        except ValidationError as e:
+            messages = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            self._reject(row_no, data.get("email") if isinstance(data.get("email"), str) else None, *messages)
+            return None
+        if not user.phone:
+            # users.phone is NOT NULL even though UserCreate allows None
+            self._reject(row_no, user.email, "phone: field required")
+            return None
+        if user.theme is not None and user.theme not in _THEMES:
+            self._reject(row_no, user.email, f"theme: must be one of {', '.join(sorted(_THEMES))}")
+            return None
+        first_row = self._seen_emails.get(user.email)
+        if first_row is not None:
+            self._reject(row_no, user.email, f"email: duplicate of row {first_row} in this upload")
+            return None
+        self._seen_emails[user.email] = row_no
+        return {
+            "id": str(uuid.uuid4()),
+            "organization_id": org_id,
+            "name": user.name,
+            "email": user.email,
+            "phone": user.phone,
+            "theme": user.theme or ThemeEnum.light.value,
+        }
+
+    async def _flush(self) -> None:
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        inserted = await self.repo.bulk_insert_users([row for _, row in chunk])
+        self.result.imported += len(inserted)
+        for row_no, row in chunk:
+            if row["id"] not in inserted:
+                self._reject(row_no, row["email"], "email: already registered")
+
+    async def run(self, rows: AsyncIterator[ParsedRow]) -> UserImportResult:
+        async for row_no, data, error in rows:
+            self.result.received += 1
+            if error is not None:
+                self._reject(row_no, None, error)
+                continue
+            row = self._validate(row_no, data)
+            if row is None:
+                continue
+            self._chunk.append((row_no, row))
+            if len(self._chunk) >= USER_IMPORT_CHUNK_SIZE:
+                await self._flush()
+        await self._flush()
+        # email conflicts are only known per chunk, after the rows around them
+        self.result.errors.sort(key=lambda error: error.row)
+        return self.result
@@ -0,0 +1,95 @@
+"""Single-flight coalescing for hot, identical reads.
+
+When many requests ask for the same key at once, only the first (the
+leader) runs the query; the others await the same in-flight task and get
+the same result or the same exception. Nothing is cached once the call
+finishes, so this only removes duplicate concurrent work.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from app.config import env_float
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_TIMEOUT_SECONDS = env_float("SINGLEFLIGHT_TIMEOUT_SECONDS", 10.0)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout: float = SINGLEFLIGHT_TIMEOUT_SECONDS):
+        self.name = name
+        self.timeout = timeout
+        self.calls = 0
+        self.collapsed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self._inflight: dict[Hashable, _Call] = {}
+        _registry.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        """Run `fn()` once per key among concurrent callers and share the outcome.
+
+        Each caller waits at most `timeout` seconds (the group default if
+        None) and gets `TimeoutError` after that. The underlying call is
+        cancelled when its last waiter gives up.
+        """
+        self.calls += 1
+        call = self._inflight.get(key)
+        if call is not None and (call.task.done() or call.task.cancelling()):
+            # finished or being cancelled, its done callback just hasn't run yet
+            call = None
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda task, key=key: self._finished(key, task))
+        else:
+            self.collapsed += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout if timeout is not None else self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"{self.name} call for {key!r} timed out")
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # unregister first: a caller arriving before the task has
+                # unwound must start a new flight, not join this one
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+                call.task.cancel()
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        call = self._inflight.get(key)
+        if call is not None and call.task is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._inflight),
+        }
+
+
+_registry: list[SingleFlight] = []
+
+
+def singleflight_stats() -> dict:
+    return {group.name: group.stats() for group in _registry}
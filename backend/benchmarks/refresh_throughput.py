@@ -0,0 +1,138 @@
+"""Refresh token rotation and revocation check throughput.
+
+Drives the app in-process (httpx ASGI transport, no server) against a
+seeded database and reports requests per second for:
+
+- `POST /api/auth/refresh`, chaining each response's refresh token into the
+  next request, so every call is a real one-time-use rotation;
+- `GET /api/auth/me` with `TOKEN_REVOCATION_CHECK` set to `off` (no check),
+  `bloom` (filter in front of the table) and `exact` (a query per request),
+  while `--revoked` other families are revoked;
+
+and, for the Bloom filter alone, its size, lookup cost and measured false
+positive rate at that fill.
+
+    cd backend
+    python -m benchmarks.refresh_throughput                       # throwaway SQLite file
+    python -m benchmarks.refresh_throughput --requests 2000 --revoked 50000
+
+Run it before and after a change to the auth path; the absolute numbers
+depend on the machine, the ratio is what matters.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmpdir.name}/refresh_throughput.db")
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import Base, engine
+from app.main import app
+from app.model.organization import Organization
+from app.model.token_family import RefreshTokenFamily
+from app.model.user import User
+from app.service import token_revocation
+from app.service.auth import _issue_tokens
+from app.service.token_revocation import BloomFilter, revocation_index
+
+
+async def seed(revoked: int) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    org_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    family_id, jti = str(uuid.uuid4()), str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=7)
+    async with engine.begin() as conn:
+        await conn.execute(insert(Organization).values(
+            id=org_id, org_code="BENCH", org_name="Bench", org_website="https://bench.example.com", status=True,
+        ))
+        await conn.execute(insert(User).values(
+            id=user_id, organization_id=org_id, name="Bench", email="bench@bench.example.com",
+            phone="5550100", theme="light", status=True,
+        ))
+        families = [{
+            "id": str(uuid.uuid4()), "user_id": user_id, "current_jti": str(uuid.uuid4()),
+            "revoked_at": now, "expires_at": expires_at,
+        } for _ in range(revoked)]
+        families.append({"id": family_id, "user_id": user_id, "current_jti": jti, "revoked_at": None, "expires_at": expires_at})
+        await conn.execute(insert(RefreshTokenFamily), families)
+    await revocation_index.load()
+    claims = {"sub": user_id, "theme": "light", "org_id": org_id, "org_code": "BENCH"}
+    return _issue_tokens(claims, family_id, jti)
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>10.0f} req/s {seconds / count * 1e6:>10.0f} us/req"
+
+
+async def bench_refresh(client: httpx.AsyncClient, refresh_token: str, requests: int) -> str:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+        response.raise_for_status()
+        refresh_token = response.json()["refresh_token"]
+    return rate(requests, time.perf_counter() - start)
+
+
+async def bench_me(client: httpx.AsyncClient, access_token: str, requests: int, mode: str) -> str:
+    token_revocation.TOKEN_REVOCATION_CHECK = mode
+    headers = {"Authorization": f"Bearer {access_token}"}
+    for _ in range(20):  # warm up, and fills the verified-token cache
+        (await client.get("/api/auth/me", headers=headers)).raise_for_status()
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/api/auth/me", headers=headers)
+        response.raise_for_status()
+    return rate(requests, time.perf_counter() - start)
+
+
+def bench_filter(revoked: int, probes: int) -> str:
+    bloom = BloomFilter(token_revocation.REVOCATION_FILTER_CAPACITY, token_revocation.REVOCATION_FILTER_ERROR_RATE)
+    for _ in range(revoked):
+        bloom.add(str(uuid.uuid4()))
+    candidates = [str(uuid.uuid4()) for _ in range(probes)]
+    start = time.perf_counter()
+    false_positives = sum(candidate in bloom for candidate in candidates)
+    elapsed = time.perf_counter() - start
+    return (
+        f"{len(bloom._bits) / 1024:.0f} KiB, {bloom.hashes} hashes, {revoked} entries: "
+        f"{elapsed / probes * 1e9:.0f} ns/lookup, false positives {false_positives}/{probes} "
+        f"({false_positives / probes:.4%}, target {token_revocation.REVOCATION_FILTER_ERROR_RATE:.4%})"
+    )
+
+
+async def run(requests: int, revoked: int) -> list[tuple[str, str]]:
+    tokens = await seed(revoked)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for mode in ("off", "bloom", "exact"):
+            results.append((f"GET /me, revocation check {mode}", await bench_me(client, tokens["access_token"], requests, mode)))
+        results.append(("POST /refresh (rotation)", await bench_refresh(client, tokens["refresh_token"], requests)))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=500, help="requests per measurement")
+    parser.add_argument("--revoked", type=int, default=10000, help="other revoked families in the table and filter")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # keeps the access log out of the output
+    results = asyncio.run(run(args.requests, args.revoked))
+    print(f"database: {engine.dialect.name}, {args.requests} requests each, {args.revoked} revoked families")
+    for name, result in results:
+        print(f"{name:<36} {result}")
+    print(f"{'bloom filter':<36} {bench_filter(args.revoked, 100000)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Database round trips per write endpoint.
+
+Drives the app in-process (httpx ASGI transport, no server) and counts what
+each request sends to the database: SQL statements plus transaction
+control (BEGIN / COMMIT / ROLLBACK), which are separate round trips on
+asyncpg.
+
+    cd backend
+    python -m benchmarks.round_trips                      # throwaway SQLite file
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.round_trips
+
+Against Postgres the schema must already be migrated (`alembic upgrade
+head`) and the benchmark leaves its rows behind, so use a scratch database.
+`POST /api/auth/verify` is only measured on Postgres; its single-statement
+path uses `UPDATE ... FROM ... RETURNING`, which SQLite can't return from.
+"""
+import argparse
+import asyncio
+import contextvars
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmpdir.name}/round_trips.db")
+
+import httpx
+from sqlalchemy import event, select
+
+from app.database import Base, engine
+from app.main import app
+from app.model.otp import OTP
+from app.service.org_directory import org_directory
+
+
+_measuring: contextvars.ContextVar["Counter | None"] = contextvars.ContextVar("measuring", default=None)
+
+
+class Counter:
+    """Counts statements and transaction control issued while handling one request.
+
+    Tracked through a context variable, so work done in tasks the request
+    spawns (e.g. by the HTTP middleware) is included.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.transactions = 0
+
+    @staticmethod
+    def install(sync_engine) -> None:
+        def on_statement(*args):
+            counter = _measuring.get()
+            if counter is not None:
+                counter.statements += 1
+
+        def on_transaction(*args):
+            counter = _measuring.get()
+            if counter is not None:
+                counter.transactions += 1
+
+        event.listen(sync_engine, "before_cursor_execute", on_statement)
+        for name in ("begin", "commit", "rollback"):
+            event.listen(sync_engine, name, on_transaction)
+
+
+class Result:
+    def __init__(self, name: str):
+        self.name = name
+        self.statements: list[int] = []
+        self.round_trips: list[int] = []
+        self.latencies_ms: list[float] = []
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<32} {statistics.mean(self.statements):>10.1f} "
+            f"{statistics.mean(self.round_trips):>11.1f} {statistics.median(self.latencies_ms):>9.2f}"
+        )
+
+
+async def measure(client: httpx.AsyncClient, result: Result, method: str, url: str, **kwargs):
+    counter = Counter()
+    token = _measuring.set(counter)
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        _measuring.reset(token)
+    response.raise_for_status()
+    result.statements.append(counter.statements)
+    result.round_trips.append(counter.statements + counter.transactions)
+    result.latencies_ms.append(elapsed)
+    return response.json()
+
+
+async def run(iterations: int) -> list[Result]:
+    postgres = engine.dialect.name == "postgresql"
+    if not postgres:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    Counter.install(engine.sync_engine)
+    results = {name: Result(name) for name in (
+        "POST create_org", "PUT update_org", "DELETE delete_org",
+        "POST create_user", "PUT update_user", "DELETE delete_user",
+        "POST auth/login", "POST auth/verify",
+    )}
+
+    # no lifespan: background refreshers would only add noise; the org
+    # directory is refreshed explicitly (and uncounted) before each login
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(iterations):
+            code = f"B{uuid.uuid4().hex[:8]}"
+            org = await measure(client, results["POST create_org"], "POST", "/api/organizationscreate_org",
+                                json={"org_code": code, "org_name": code, "org_website": None})
+            await measure(client, results["PUT update_org"], "PUT", f"/api/organizationsupdate_org/{org['id']}",
+                          json={"org_code": code, "org_name": f"{code} renamed", "org_website": None, "status": True})
+
+            user = await measure(client, results["POST create_user"], "POST", "/api/userscreate_user", json={
+                "organization_id": org["id"],
+                "name": "Bench",
+                "email": f"{uuid.uuid4().hex[:12]}@bench.example.com",
+                "phone": "5550100",
+                "theme": "light",
+            })
+            await measure(client, results["PUT update_user"], "PUT",
+                          f"/api/usersupdate_user/{user['id']}/{org['id']}",
+                          json={"name": "Bench renamed", "email": user["email"], "phone": "5550100", "theme": "dark"})
+
+            await org_directory.load()
+            login = await measure(client, results["POST auth/login"], "POST", "/api/auth/login",
+                                  json={"email": user["email"], "org_code": code})
+            if postgres:
+                async with engine.connect() as conn:
+                    otp_code = await conn.scalar(select(OTP.code).where(OTP.id == login["otp_id"]))
+                await measure(client, results["POST auth/verify"], "POST", "/api/auth/verify", json={
+                    "user_id": user["id"],
+                    "organization_id": org["id"],
+                    "phone_number": "5550100",
+                    "otp_code": otp_code,
+                    "otp_id": login["otp_id"],
+                })
+
+            await measure(client, results["DELETE delete_user"], "DELETE",
+                          f"/api/usersdelete_user/{user['id']}/{org['id']}")
+            await measure(client, results["DELETE delete_org"], "DELETE",
+                          f"/api/organizationsdelete_org/{org['id']}")
+    return [result for result in results.values() if result.statements]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # keeps the access log out of the output
+    results = asyncio.run(run(args.iterations))
+    print(f"database: {engine.dialect.name}, {args.iterations} requests per endpoint")
+    print(f"{'endpoint':<32} {'statements':>10} {'round trips':>11} {'p50 ms':>9}")
+    for result in results:
+        print(result.row())
+
+
+if __name__ == "__main__":
+    main()
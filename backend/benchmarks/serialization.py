@@ -0,0 +1,117 @@
+"""CPU per request on the list endpoints.
+
+Drives the app in-process (httpx ASGI transport, no server) against a
+seeded database and reports, per endpoint, the median wall time and the
+mean process CPU time of a full page request: query, row handling,
+validation and JSON encoding.
+
+    cd backend
+    python -m benchmarks.serialization                    # throwaway SQLite file
+    python -m benchmarks.serialization --rows 1000 --requests 50
+
+Run it before and after a change to the read path; the absolute numbers
+depend on the machine, the ratio is what matters.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmpdir.name}/serialization.db")
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import Base, engine
+from app.main import app
+from app.model.organization import Organization
+from app.model.user import User
+
+
+class Result:
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_ms: list[float] = []
+        self.cpu_ms: list[float] = []
+
+    def row(self) -> str:
+        return f"{self.name:<36} {statistics.median(self.wall_ms):>9.2f} {statistics.mean(self.cpu_ms):>9.2f}"
+
+
+async def seed(rows: int) -> str:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    org_id = str(uuid.uuid4())
+    orgs = [{
+        "id": org_id if i == 0 else str(uuid.uuid4()),
+        "org_code": f"S{i:06d}",
+        "org_name": f"Organization {i}",
+        "org_website": f"https://org{i}.example.com",
+        "status": True,
+        "created_at": start + timedelta(seconds=i),
+    } for i in range(rows)]
+    users = [{
+        "id": str(uuid.uuid4()),
+        "organization_id": org_id,
+        "name": f"User {i}",
+        "email": f"user{i}@bench.example.com",
+        "phone": "5550100",
+        "theme": "light",
+        "status": True,
+        "created_at": start + timedelta(seconds=i),
+    } for i in range(rows)]
+    async with engine.begin() as conn:
+        await conn.execute(insert(Organization), orgs)
+        await conn.execute(insert(User), users)
+    return org_id
+
+
+async def measure(client: httpx.AsyncClient, result: Result, url: str, requests: int) -> None:
+    for _ in range(requests):
+        wall, cpu = time.perf_counter(), time.process_time()
+        response = await client.get(url)
+        result.cpu_ms.append((time.process_time() - cpu) * 1000)
+        result.wall_ms.append((time.perf_counter() - wall) * 1000)
+        response.raise_for_status()
+
+
+async def run(rows: int, requests: int) -> list[Result]:
+    org_id = await seed(rows)
+    endpoints = {
+        f"GET get_org_list (limit={rows})": f"/api/organizationsget_org_list?limit={rows}",
+        f"GET get_user_list (limit={rows})": f"/api/usersget_user_list/{org_id}?limit={rows}",
+        f"GET export_users ({rows} rows)": f"/api/usersexport_users/{org_id}",
+    }
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in endpoints.items():
+            result = Result(name)
+            await measure(client, Result(name), url, 3)  # warm up
+            await measure(client, result, url, requests)
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=1000, help="rows seeded and returned per page")
+    parser.add_argument("--requests", type=int, default=30)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # keeps the access log out of the output
+    results = asyncio.run(run(args.rows, args.requests))
+    print(f"database: {engine.dialect.name}, {args.requests} requests per endpoint")
+    print(f"{'endpoint':<36} {'p50 ms':>9} {'cpu ms':>9}")
+    for result in results:
+        print(result.row())
+
+
+if __name__ == "__main__":
+    main()
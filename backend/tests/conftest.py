@@ -0,0 +1,76 @@
+"""Shared fixtures.
+
+The suite runs the app in-process against a throwaway SQLite file with
+`QUERY_BUDGET_STRICT` on, so any route that grows an N+1 loop (or goes
+over its statement budget) fails here. Settings are read at import time,
+hence the environment is set before anything from `app` is imported.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmpdir.name}/tests.db"
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+os.environ["METRICS_ENABLED"] = "false"
+os.environ["ADMIN_API_TOKEN"] = "test-admin"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.model  # noqa: F401  registers every table on Base.metadata
+from app.database import Base, engine
+from app.main import app
+
+
+async def _create_tables() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # the pool's connections belong to this loop; the client runs its own
+    await engine.dispose()
+
+
+asyncio.run(_create_tables())
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_headers() -> dict:
+    return {"X-Admin-Token": os.environ["ADMIN_API_TOKEN"]}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def org(client) -> dict:
+    code = uuid.uuid4().hex[:8].upper()
+    response = client.post(
+        "/api/organizationscreate_org",
+        json={"org_code": code, "org_name": f"Org {code}", "org_website": "https://example.com"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def make_user(client, org):
+    def make(index: int = 0, theme: str = "light") -> dict:
+        response = client.post("/api/userscreate_user", json={
+            "organization_id": org["id"],
+            "name": f"User {index}",
+            "email": f"user{index}-{uuid.uuid4().hex[:6]}@example.com",
+            "phone": f"555{index:04d}",
+            "theme": theme,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
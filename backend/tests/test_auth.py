@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis
+
+from app.repository.otp_store import MemoryOtpStore, RedisOtpStore
+from app.service import auth
+
+
+@pytest.fixture
+def otp_store(monkeypatch):
+    """Codes are not sent anywhere yet, so the tests read them from a store they own."""
+    store = MemoryOtpStore()
+    monkeypatch.setattr(auth, "get_otp_store", lambda db: store)
+    return store
+
+
+def _login(client, org, user, store) -> dict:
+    response = client.post("/api/auth/login", json={"email": user["email"], "org_code": org["org_code"]})
+    assert response.status_code == 200, response.text
+    otp_id = response.json()["otp_id"]
+    (record,) = [record for _, record in store._codes.values() if record.id == otp_id]
+    return {
+        "user_id": user["id"],
+        "organization_id": org["id"],
+        "phone_number": user["phone"],
+        "otp_code": record.code,
+        "otp_id": otp_id,
+    }
+
+
+def test_otp_is_single_use(client, org, make_user, otp_store):
+    verify = _login(client, org, make_user(), otp_store)
+    first = client.post("/api/auth/verify", json=verify)
+    assert first.status_code == 200, first.text
+    assert set(first.json()) >= {"access_token", "refresh_token"}
+    again = client.post("/api/auth/verify", json=verify)
+    assert again.status_code == 401
+
+
+def test_wrong_otp_is_rejected(client, org, make_user, otp_store):
+    verify = _login(client, org, make_user(), otp_store)
+    wrong = client.post("/api/auth/verify", json={**verify, "otp_code": "00000"})
+    assert wrong.status_code == 401
+    # the failed attempt did not use up the real code
+    assert client.post("/api/auth/verify", json=verify).status_code == 200
+
+
+def test_refresh_token_reuse_revokes_the_family(client, org, make_user, otp_store):
+    tokens = client.post("/api/auth/verify", json=_login(client, org, make_user(), otp_store)).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    rotated = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200, rotated.text
+    assert rotated.json()["refresh_token"] != tokens["refresh_token"]
+
+    # presenting the exchanged token again ends the whole family
+    reused = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert reused.status_code == 401
+    latest = client.post("/api/auth/refresh", json={"refresh_token": rotated.json()["refresh_token"]})
+    assert latest.status_code == 401
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("make_store", [MemoryOtpStore, lambda: RedisOtpStore(aioredis.FakeRedis())])
+async def test_concurrent_verifies_consume_a_code_once(make_store):
+    # the SQL store needs Postgres (UPDATE ... FROM ... RETURNING); not covered on SQLite
+    store = make_store()
+    record = await store.issue("user", "org", "5550100")
+    results = await asyncio.gather(*(store.verify("user", "org", "5550100", record.code) for _ in range(5)))
+    assert [result.id for result in results if result is not None] == [record.id]
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis
+from pydantic import BaseModel
+
+from app.cache import MemoryCache, ReadThroughCache, RedisCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Row(BaseModel):
+    version: int
+
+
+def _backends():
+    return [MemoryCache(), RedisCache(aioredis.FakeRedis(), tombstone_ttl=0.05)]
+
+
+@pytest.mark.parametrize("backend", _backends(), ids=["memory", "redis"])
+async def test_hit_after_miss(backend):
+    cache = ReadThroughCache(backend, ttl=60)
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return {"version": 1}
+
+    assert (await cache.get_or_load("rows", "a", load, Row)).version == 1
+    assert (await cache.get_or_load("rows", "a", load, Row)).version == 1
+    assert loads == 1
+
+
+@pytest.mark.parametrize("backend", _backends(), ids=["memory", "redis"])
+async def test_load_overtaken_by_invalidation_is_not_stored(backend):
+    cache = ReadThroughCache(backend, ttl=60)
+    release = asyncio.Event()
+
+    async def load_before_write():
+        await release.wait()
+        return {"version": 1}
+
+    reader = asyncio.create_task(cache.get_or_load("rows", "a", load_before_write, Row))
+    await asyncio.sleep(0)
+    await cache.invalidate("rows", "a")  # the write commits while the read is in flight
+    release.set()
+    assert (await reader).version == 1
+    assert await backend.get("rows:a") is None
+
+
+async def test_redis_tombstone_refuses_fills_from_other_workers():
+    backend = RedisCache(aioredis.FakeRedis(), tombstone_ttl=0.05)
+    await backend.delete("rows:a")
+    # a worker the eviction has not reached yet stores its pre-write row
+    await backend.set("rows:a", {"version": 1}, 60)
+    assert await backend.get("rows:a") is None
+    await asyncio.sleep(0.1)
+    await backend.set("rows:a", {"version": 2}, 60)
+    assert await backend.get("rows:a") == {"version": 2}
@@ -0,0 +1,37 @@
+import pytest
+
+from app.query_stats import QueryBudgetExceeded, QueryStats
+
+
+def test_user_list_stays_within_budget(client, org, make_user):
+    for index in range(12):
+        make_user(index)
+    # one user per row: an N+1 here would trip the repeat limit
+    response = client.get(f"/api/usersget_user_list/{org['id']}", params={"limit": 20})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == 12
+    assert "queries" in response.headers["server-timing"]
+    assert response.json()["next_cursor"] is None
+
+    response = client.get(f"/api/usersget_user_list/{org['id']}", params={"limit": 5})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == 5
+    assert response.json()["next_cursor"] is not None
+
+
+def test_org_routes_stay_within_budget(client, org):
+    response = client.get("/api/organizationsget_org_list", params={"limit": 2})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) <= 2
+    response = client.get(f"/api/organizationsget_org_list_by_id/{org['id']}")
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == org["id"]
+
+
+def test_strict_mode_flags_repeated_statements():
+    stats = QueryStats()
+    statement = "SELECT users.id FROM users WHERE users.id = ?"
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        for _ in range(10):
+            stats.check(statement)
+            stats.record(statement, 0.0)
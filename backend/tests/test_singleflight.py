@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.database import DATABASE_URL
+from app.service.organization import OrganizationService
+from app.service.userService import UserService
+from app.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test.shared")
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+    assert results == [1] * 10
+    assert flight.collapsed == 9
+
+
+async def test_caller_after_timeout_starts_a_new_flight():
+    flight = SingleFlight("test.timeout", timeout=0.01)
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    with pytest.raises(TimeoutError):
+        await flight.do("key", slow)
+    # the cancelled task has not unwound yet; it must not be joined
+    assert await flight.do("key", fast) == "fast"
+
+
+async def test_flights_do_not_wait_on_a_second_pooled_connection(org):
+    """With one pooled connection, the version query's connection must be
+    handed back before the flight takes its own."""
+    engine = create_async_engine(
+        DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=1
+    )
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with sessions() as db:
+            service = UserService(db)
+            await service.get_users_version(org["id"])
+            page = await service.get_all_users(org["id"], 10)
+            assert page.items == []
+        async with sessions() as db:
+            await db.execute(text("SELECT 1"))  # the request already holds the connection
+            found = await OrganizationService(db).get_org(org["id"])
+            assert found.id == org["id"]
+    finally:
+        await engine.dispose()
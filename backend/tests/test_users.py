@@ -0,0 +1,62 @@
+import time
+
+
+def test_get_user_by_id_answers_conditional_requests(client, org, make_user):
+    user = make_user()
+    url = f"/api/usersget_user_by_id/{user['id']}/{org['id']}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    time.sleep(1.05)  # SQLite's CURRENT_TIMESTAMP has whole-second resolution
+    response = client.put(f"/api/usersupdate_user/{user['id']}/{org['id']}", json={
+        "name": "Renamed", "email": user["email"], "phone": user["phone"], "theme": "dark",
+    })
+    assert response.status_code == 200, response.text
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Renamed"
+    assert changed.headers["etag"] != etag
+
+
+def test_bulk_update_by_filter(client, org, make_user):
+    light = [make_user(index)["id"] for index in range(3)]
+    make_user(3, theme="dark")
+    response = client.put(f"/api/usersbulk_update_users/{org['id']}", json={
+        "filter": {"theme": "light"}, "changes": {"theme": "dark"},
+    })
+    assert response.status_code == 200, response.text
+    assert sorted(response.json()["ids"]) == sorted(light)
+    user = client.get(f"/api/usersget_user_by_id/{light[0]}/{org['id']}").json()
+    assert user["theme"] == "dark"
+
+
+def test_bulk_update_rejects_unknown_themes(client, org):
+    for body in (
+        {"filter": {"theme": "blue"}, "changes": {"name": "x"}},
+        {"filter": {}, "changes": {"theme": "blue"}},
+    ):
+        response = client.put(f"/api/usersbulk_update_users/{org['id']}", json=body)
+        assert response.status_code == 422
+
+
+def test_import_users_reports_bad_rows(client, org):
+    body = (
+        "name,email,phone,theme\n"
+        "Ann,ann@example.com,5550001,light\n"
+        "Bob,not-an-email,5550002,dark\n"
+    )
+    response = client.post(
+        f"/api/usersimport_users/{org['id']}", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["received"], result["imported"], result["failed"]) == (2, 1, 1)
+    assert result["errors"][0]["row"] == 2
+
+
+def test_manual_sweep_conflicts_where_the_sweeper_does_not_apply(client, admin_headers):
+    # the sweeper only applies to the SQL OTP store on Postgres
+    response = client.post("/api/admin/otp/sweeper/run", headers=admin_headers)
+    assert response.status_code == 409